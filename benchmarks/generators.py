@@ -0,0 +1,77 @@
+import random
+
+from tsidii.reader import ReaderCollection
+
+
+def synthetic_readers(count, group_count=20, groups_per_reader=2, seed=0):
+    '''
+        Yields keyword arguments for ReaderCollection.add_reader
+
+        :param int count: Number of readers
+        :param int group_count: Number of distinct groups
+        :param int groups_per_reader: Groups each reader belongs to
+        :param int seed: Seed of the random generator
+        :return generator: dict of reader data
+    '''
+    rng = random.Random(seed)
+    groups = ["group{}".format(number) for number in range(group_count)]
+    groups_per_reader = min(groups_per_reader, group_count)
+    for number in range(count):
+        yield {
+            "email": "reader{}@example.com".format(number),
+            "first_name": "reader{}".format(number),
+            "last_name": "synthetic",
+            "identifier": "r{}".format(number),
+            "groups": rng.sample(groups, groups_per_reader) if groups_per_reader else None
+        }
+
+
+def synthetic_collection(count, group_count=20, groups_per_reader=2, seed=0,
+                         collection_class=ReaderCollection):
+    '''
+        :return ReaderCollection: A collection of synthetic readers
+    '''
+    collection = collection_class()
+    for data in synthetic_readers(count, group_count, groups_per_reader, seed):
+        collection.add_reader(**data)
+    return collection
+
+
+def synthetic_body(size, note_density=0.1, nesting=1, group_count=20,
+                   reader_count=1000, seed=0):
+    '''
+        Creates an HTML body with notes for synthetic readers
+
+        :param int size: Approximate length of the body in characters
+        :param float note_density: Share of paragraphs that are notes
+        :param int nesting: Maximum depth of nested notes
+        :param int group_count: Number of groups notes can address
+        :param int reader_count: Number of readers notes can address
+        :param int seed: Seed of the random generator
+        :return string: The body
+    '''
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < size:
+        paragraph = _paragraph(rng, note_density, nesting, group_count, reader_count)
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+    return "<html><body>{}</body></html>".format("".join(paragraphs))
+
+
+def _paragraph(rng, note_density, depth, group_count, reader_count):
+    text = "<p>Lorem <b>ipsum</b> dolor sit amet &amp; consectetur {}.</p>".format(
+        rng.randint(0, 10 ** 6)
+    )
+    if depth < 1 or rng.random() >= note_density:
+        return text
+    kind = rng.choice(["message", "message", "hidden", "private"])
+    if kind == "private" or rng.random() < 0.2:
+        audience = "r{}".format(rng.randrange(reader_count))
+    else:
+        audience = " ".join(
+            "group{}".format(rng.randrange(group_count)) for _ in range(rng.randint(1, 3))
+        )
+    inner = _paragraph(rng, note_density, depth - 1, group_count, reader_count)
+    return "<note {}='{}'>{}</note>".format(kind, audience, inner)
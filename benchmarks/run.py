@@ -0,0 +1,190 @@
+'''
+    Runs the Tsidii benchmarks and saves the results as JSON
+
+        python -m benchmarks.run --readers 1000 10000 --output results.json
+        python -m benchmarks.run --compare old.json new.json
+'''
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import tsidii
+from tsidii.email import TsidiiEmail
+from tsidii.parser import HTMLParser
+from tsidii.reader import ReaderCollection, CompactReaderCollection
+from tsidii.scanner import NoteScanner
+
+from benchmarks.generators import (
+    synthetic_body, synthetic_collection, synthetic_readers
+)
+
+COLLECTIONS = {
+    "list": ReaderCollection,
+    "compact": CompactReaderCollection
+}
+PARSERS = {
+    "html": HTMLParser,
+    "scanner": NoteScanner
+}
+
+
+def measure(function, memory=False):
+    '''
+        Runs function once and times it, optionally tracing peak memory
+
+        :return tuple: (seconds, peak bytes or None, result of function)
+    '''
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def bench_load(args, count, group_count, collection):
+    def load():
+        readers = COLLECTIONS[collection]()
+        readers.add_readers(synthetic_readers(count, group_count))
+        return readers
+    return measure(load, args.memory)
+
+
+def bench_as_json(args, count, group_count, collection):
+    readers = synthetic_collection(
+        count, group_count, collection_class=COLLECTIONS[collection]
+    )
+    return measure(readers.as_json, args.memory)
+
+
+def bench_reader_emails(args, count, group_count, collection, parser, body_size):
+    readers = synthetic_collection(
+        count, group_count, collection_class=COLLECTIONS[collection]
+    )
+    body = synthetic_body(
+        body_size,
+        note_density=args.note_density,
+        nesting=args.nesting,
+        group_count=group_count,
+        reader_count=count
+    )
+
+    def send():
+        email = TsidiiEmail(body, readers, PARSERS[parser](cache=False))
+        size = 0
+        for _, (message, _) in email.reader_emails(workers=args.workers):
+            size += len(message)
+        return size
+    return measure(send, args.memory)
+
+
+def run(args):
+    results = []
+    for count in args.readers:
+        for group_count in args.groups:
+            for collection in args.collections:
+                params = {"readers": count, "groups": group_count, "collection": collection}
+                cases = [
+                    ("load", params, bench_load(args, count, group_count, collection)),
+                    ("as_json", params, bench_as_json(args, count, group_count, collection))
+                ]
+                for parser in args.parsers:
+                    for body_size in args.body_sizes:
+                        send_params = dict(params, parser=parser, body_size=body_size,
+                                           note_density=args.note_density,
+                                           nesting=args.nesting, workers=args.workers)
+                        cases.append((
+                            "reader_emails",
+                            send_params,
+                            bench_reader_emails(args, count, group_count, collection,
+                                                parser, body_size)
+                        ))
+                for name, case_params, (seconds, peak, _) in cases:
+                    result = {
+                        "benchmark": name,
+                        "params": case_params,
+                        "seconds": seconds,
+                        "readers_per_second": count / seconds if seconds else None,
+                        "peak_bytes": peak
+                    }
+                    if name == "reader_emails":
+                        result["emails_per_second"] = result["readers_per_second"]
+                    results.append(result)
+                    print("{:<14} {:<70} {:>10.4f}s {:>12.0f}/s".format(
+                        name, json.dumps(case_params, sort_keys=True), seconds,
+                        result["readers_per_second"] or 0
+                    ))
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "tsidii": tsidii.__version__,
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+
+def compare(old_path, new_path):
+    def key(result):
+        return (result["benchmark"], json.dumps(result["params"], sort_keys=True))
+    with open(old_path) as fp:
+        old = {key(result): result for result in json.load(fp)["results"]}
+    with open(new_path) as fp:
+        new = json.load(fp)["results"]
+    for result in new:
+        previous = old.get(key(result))
+        if previous is None:
+            continue
+        print("{:<14} {:<70} {:>8.2f}x".format(
+            result["benchmark"],
+            key(result)[1],
+            previous["seconds"] / result["seconds"] if result["seconds"] else 0
+        ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tsidii benchmarks")
+    parser.add_argument("--readers", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--groups", type=int, nargs="+", default=[20])
+    parser.add_argument("--collections", nargs="+", choices=sorted(COLLECTIONS), default=["list"])
+    parser.add_argument("--parsers", nargs="+", choices=sorted(PARSERS), default=["html", "scanner"])
+    parser.add_argument("--body-sizes", type=int, nargs="+", default=[20000])
+    parser.add_argument("--note-density", type=float, default=0.1)
+    parser.add_argument("--nesting", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--memory", action="store_true", help="Trace peak memory (slower)")
+    parser.add_argument("--output", help="File to save the results to as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="Print the speedup of NEW over OLD and exit")
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump({"metadata": metadata(), "results": results}, fp, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
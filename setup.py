@@ -1,22 +1,17 @@
-from pip.req import parse_requirements
 from setuptools import setup, find_packages
 
 
-def get_reqs(reqs):
-    return [str(ir.req) for ir in reqs]
+def get_reqs(path):
+    with open(path) as fp:
+        return [line.strip() for line in fp if line.strip() and not line.startswith("#")]
 
-try:
-    install_reqs = get_reqs(parse_requirements("requirements.txt"))
-except TypeError:
-    from pip.download import PipSession
-    install_reqs = get_reqs(
-        parse_requirements("requirements.txt", session=PipSession())
-    )
+
+install_reqs = get_reqs("requirements.txt")
 
 setup(
     name="Tsidii",
     version=__import__("tsidii").__version__,
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     url="example.com",
     author="Forrest York",
     author_email="forrest.york@gmail.com",
@@ -25,6 +20,13 @@ setup(
     license="BSD",
     keywords="email",
     install_requires=install_reqs,
+    extras_require={
+        "numpy": ["numpy"]
+    },
+    entry_points={
+        "console_scripts": ["tsidii=tsidii.cli:main"]
+    },
+    python_requires=">=3.7",
     zip_safe=False,
     classifiers=[
         "Development Status :: 3 - Alpha",
@@ -32,7 +34,8 @@ setup(
         "License :: OSI Approved :: BSD License",
         "Intended Audience :: Developers",
         "Operating System :: OS Independent",
-        "Programming Language :: Python :: 2.7, 3.4",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.7",
         "Natural Language :: English"
     ]
 )
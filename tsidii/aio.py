@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from collections import namedtuple
+from itertools import islice
+
+SinkResult = namedtuple("SinkResult", ["delivered", "failures"])
+
+
+def _next_batch(results, batch_size, lock):
+    with lock:
+        return list(islice(results, batch_size))
+
+
+def _close(results, lock):
+    # Waits for the batch being parsed, closing a running generator fails
+    with lock:
+        results.close()
+
+
+async def areader_emails(email, batch_size=256, queue_size=4, executor=None,
+                         **options):
+    '''
+        Asynchronous counterpart of TsidiiEmail.reader_emails. Emails are
+        parsed in batches in an executor and at most queue_size batches
+        wait to be consumed, parsing pauses while the queue is full.
+
+        :param TsidiiEmail email: The email to parse
+        :param int batch_size: Readers parsed per executor call
+        :param int queue_size: Parsed batches buffered at most
+        :param Executor executor: Executor to parse in, defaults to the loop's
+        :param options: Keyword arguments for TsidiiEmail.reader_emails
+        :return async generator: (TsidiiReader, (message, private flag)) tuples
+    '''
+    loop = asyncio.get_running_loop()
+    results = email.reader_emails(**options)
+    lock = threading.Lock()
+    queue = asyncio.Queue(maxsize=queue_size)
+
+    async def produce():
+        try:
+            while True:
+                batch = await loop.run_in_executor(
+                    executor, _next_batch, results, batch_size, lock
+                )
+                await queue.put(batch)
+                if not batch:
+                    return
+        except Exception as error:
+            await queue.put(error)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            batch = await queue.get()
+            if isinstance(batch, Exception):
+                raise batch
+            if not batch:
+                return
+            for item in batch:
+                yield item
+    finally:
+        producer.cancel()
+        # Stops the workers of reader_emails when the consumer stops early
+        await loop.run_in_executor(executor, _close, results, lock)
+
+
+async def adeliver(email, sink, concurrency=10, **options):
+    '''
+        Parses every email and hands it to an async sink, with at most
+        concurrency sink calls running at once. Parsing continues while
+        the sink runs but stops when the sink falls behind.
+
+        :param TsidiiEmail email: The email to parse
+        :param coroutine function sink: Called as sink(reader, (message, private flag))
+        :param int concurrency: Sink calls running at most
+        :param options: Keyword arguments for areader_emails
+        :return SinkResult: Number of delivered emails and (reader, error) failures
+    '''
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = []
+    delivered = [0]
+    tasks = set()
+
+    async def send(reader, result):
+        try:
+            await sink(reader, result)
+            delivered[0] += 1
+        except Exception as error:
+            failures.append((reader, error))
+        finally:
+            semaphore.release()
+
+    try:
+        async for reader, result in areader_emails(email, **options):
+            await semaphore.acquire()
+            task = asyncio.ensure_future(send(reader, result))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        # Sink calls that started finish before a parse error is raised
+        if tasks:
+            await asyncio.gather(*tasks)
+    return SinkResult(delivered[0], failures)
@@ -0,0 +1,109 @@
+from tsidii.template import DECOMPOSE, PRIVATE
+
+
+class NoteAudience(object):
+    '''
+        Who sees a single note of a body
+    '''
+
+    def __init__(self, note):
+        self.index = note.index
+        self.message = sorted(note.message)
+        self.hidden = sorted(note.hidden)
+        self.private = sorted(note.private)
+        self.visible = 0
+        self.private_recipients = []
+        self.hidden_from = []
+        self.unknown = []
+
+    def as_dict(self):
+        return {
+            "index": self.index,
+            "message": self.message,
+            "hidden": self.hidden,
+            "private": self.private,
+            "visible": self.visible,
+            "privateRecipients": self.private_recipients,
+            "hiddenFrom": self.hidden_from,
+            "unknown": self.unknown
+        }
+
+
+class AudienceReport(object):
+    '''
+        Who sees which notes of a body, computed without parsing any email
+    '''
+
+    def __init__(self, notes, readers):
+        self.notes = notes
+        self.readers = readers
+
+    @property
+    def private_recipients(self):
+        '''
+            :return list<string>: Identifiers of readers with a private note
+        '''
+        recipients = set()
+        for note in self.notes:
+            recipients.update(note.private_recipients)
+        return sorted(recipients)
+
+    @property
+    def warnings(self):
+        '''
+            :return list<string>: A message for every note name that matches no reader
+        '''
+        return [
+            "Note {} names unknown identifier or group '{}'".format(note.index, name)
+            for note in self.notes
+            for name in note.unknown
+        ]
+
+    def as_dict(self):
+        return {
+            "readers": self.readers,
+            "notes": [note.as_dict() for note in self.notes],
+            "privateRecipients": self.private_recipients,
+            "warnings": self.warnings
+        }
+
+
+def audience_report(parser, compiled, recipients):
+    '''
+        Counts the readers that see every note of a body. Readers are
+        grouped by the note names they match, so the notes are only
+        evaluated once per group.
+
+        :param BaseParser parser: Parser that compiled the body
+        :param CompiledBody compiled: The compiled body
+        :param ReaderCollection recipients: Readers the email is sent to
+        :return AudienceReport: Audience of every note
+    '''
+    index = parser.audience_index(compiled)
+    masks = {}
+    readers = 0
+    for reader in recipients:
+        masks.setdefault(index.reader_mask(reader), []).append(reader.identifier)
+        readers += 1
+    notes = [NoteAudience(note) for note in compiled.notes]
+    for mask, identifiers in masks.items():
+        actions = index.mask_actions(mask)
+        for note, action in zip(notes, actions):
+            if action != DECOMPOSE:
+                note.visible += len(identifiers)
+            if action == PRIVATE:
+                note.private_recipients.extend(identifiers)
+            elif action == DECOMPOSE and mask & index.hidden[note.index]:
+                note.hidden_from.extend(identifiers)
+    known = set(name for name in index.bits if _is_known(recipients, name))
+    for note, segment in zip(notes, compiled.notes):
+        note.unknown = sorted(
+            (segment.message | segment.hidden | segment.private) - known
+        )
+        note.private_recipients.sort()
+        note.hidden_from.sort()
+    return AudienceReport(notes, readers)
+
+
+def _is_known(recipients, name):
+    return name in recipients.groups or recipients.get(name) is not None
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class TemplateCache(object):
+    '''
+        Least recently used cache of compiled bodies. Bodies are keyed by
+        their hash and the configuration of the parser that compiled them,
+        so parsers with the same configuration can share compiled bodies.
+    '''
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        if max_entries < 1:
+            raise ValueError("Cache must hold at least one entry")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __reduce__(self):
+        # Locks can't be pickled, workers get their own cache instead
+        if self is default_cache:
+            return (get_default_cache, ())
+        return (TemplateCache, (self.max_entries, self.max_bytes))
+
+    def compile(self, parser, body):
+        '''
+            Returns the compiled body from the cache, compiling and storing
+            it on a miss
+
+            :param BaseParser parser: Parser used to compile the body
+            :param string body: The message to be compiled
+            :return CompiledBody: The compiled message
+        '''
+        data = body.encode("utf-8")
+        key = (parser.config(), hashlib.sha256(data).hexdigest())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        compiled = parser.compile_body(body)
+        self._store(key, compiled, len(data))
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        '''
+            :return dict: Hit and miss counters and the current size of the cache
+        '''
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.size
+        }
+
+    def _store(self, key, compiled, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (compiled, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+
+default_cache = TemplateCache()
+
+
+def get_default_cache():
+    '''
+        :return TemplateCache: The cache shared by every parser of the process
+    '''
+    return default_cache
@@ -0,0 +1,61 @@
+from tsidii.render import iter_chunks, reader_parts
+from tsidii.parser import BaseParser, HTMLParser
+from tsidii.reader import ReaderCollection
+
+
+class TsidiiCampaign(object):
+    '''
+        Several bodies sent to the same recipients, such as the language
+        versions of an email. The note indexes of all bodies share their
+        bits, so the mask of a reader is built once for the campaign, and
+        readers with the same mask in a batch are evaluated once.
+    '''
+    # Number of readers whose note actions are decided together
+    batch_size = 1024
+
+    def __init__(self, bodies, recipients, parser=None):
+        bodies = list(bodies)
+        if not bodies:
+            raise ValueError("A campaign needs at least one body")
+        for body in bodies:
+            if not isinstance(body, str):
+                raise ValueError("Email body must be a string")
+        if not isinstance(recipients, ReaderCollection):
+            raise ValueError("Recipients must be an instance of ReaderCollection")
+        self.bodies = bodies
+        self.recipients = recipients
+        if parser is None:
+            parser = HTMLParser()
+        elif not isinstance(parser, BaseParser):
+            raise ValueError("Parser must be an instance of BaseParser")
+        self.parser = parser
+        self.class_counts = [0] * len(bodies)
+
+    def reader_emails(self):
+        '''
+            Yields every reader with their parsed email for every body
+
+            :return generator: (TsidiiReader, [(message, private flag) per body]) tuples
+        '''
+        compiled = [self.parser.compile(body) for body in self.bodies]
+        bits = {}
+        indexes = [self.parser.audience_index(body, bits=bits) for body in compiled]
+        classes = [{} for body in compiled]
+        self.class_counts = [0] * len(compiled)
+        for readers in iter_chunks(self.recipients, self.batch_size):
+            masks = [indexes[0].reader_mask(reader) for reader in readers]
+            unique = list(dict.fromkeys(masks))
+            # Resolved parts of every body for each mask of the batch
+            mask_parts = dict((mask, []) for mask in unique)
+            for number, index in enumerate(indexes):
+                resolved = reader_parts(
+                    compiled[number], index.masks_actions, unique, len(unique),
+                    classes[number]
+                )
+                for mask, _, parts in resolved:
+                    mask_parts[mask].append(parts)
+                self.class_counts[number] = len(classes[number])
+            for reader, mask in zip(readers, masks):
+                yield reader, [
+                    self.parser.fill(parts, reader) for parts in mask_parts[mask]
+                ]
@@ -0,0 +1,122 @@
+import os
+
+
+class ProgressJournal(object):
+    '''
+        Append only file of the identifiers of readers that are done.
+        Identifiers are written in batches, each batch ends with a commit
+        line and only committed batches count when the journal is opened
+        again, a batch cut short by a crash is dropped.
+
+        before_flush is called before every batch is written, it should
+        make the output of the batch durable and may return a mark, such as
+        the size of an output file, that is saved with the batch and read
+        back as a string in the mark attribute. A consumer that truncates
+        its output to the mark when resuming gets every email exactly once.
+    '''
+
+    def __init__(self, path, batch_size=1000, before_flush=None):
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        self.path = path
+        self.batch_size = batch_size
+        self.before_flush = before_flush
+        self.completed = set()
+        self.mark = None
+        self._pending = []
+        self._load()
+        self._fp = open(path, "ab")
+
+    def __contains__(self, identifier):
+        return identifier in self.completed
+
+    def __len__(self):
+        return len(self.completed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, identifier):
+        '''
+            Marks a reader as done, the journal is written every batch_size
+            readers
+
+            :param string identifier: Identifier of the reader
+        '''
+        if "\n" in identifier:
+            raise ValueError("Identifiers in a journal can't contain new lines")
+        self.completed.add(identifier)
+        self._pending.append(identifier)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        '''
+            Writes the readers recorded since the last flush as a batch
+        '''
+        if not self._pending:
+            return
+        mark = self.before_flush() if self.before_flush is not None else None
+        lines = ["+{}\n".format(identifier) for identifier in self._pending]
+        lines.append("={}\n".format("" if mark is None else mark))
+        self._fp.write("".join(lines).encode("utf-8"))
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self.mark = mark
+        self._pending = []
+
+    def close(self):
+        if self._fp.closed:
+            return
+        self.flush()
+        self._fp.close()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        committed = 0
+        size = 0
+        batch = []
+        with open(self.path, "rb") as fp:
+            for line in fp:
+                size += len(line)
+                if not line.endswith(b"\n"):
+                    break
+                text = line[:-1].decode("utf-8")
+                if text.startswith("+"):
+                    batch.append(text[1:])
+                elif text.startswith("="):
+                    self.completed.update(batch)
+                    batch = []
+                    self.mark = text[1:] or None
+                    committed = size
+                else:
+                    raise ValueError("'{}' is not a progress journal".format(self.path))
+        if committed < size:
+            # Drop the batch that was being written when the send stopped
+            with open(self.path, "r+b") as fp:
+                fp.truncate(committed)
+
+
+def resume(email, journal, **options):
+    '''
+        Yields the parsed emails of the readers of a TsidiiEmail that are
+        not in the journal, readers that are done are skipped before they
+        are parsed. A reader is recorded when the consumer asks for the
+        next email, so an email only counts as done once it was handled.
+
+        :param TsidiiEmail email: The email being sent
+        :param ProgressJournal journal: Journal of the readers that are done
+        :param options: Keyword arguments for TsidiiEmail.reader_emails
+        :return generator: (TsidiiReader, (message, private flag)) tuples
+    '''
+    completed = journal.completed
+    pending = (
+        reader for reader in email.recipients if reader.identifier not in completed
+    )
+    for reader, result in email.reader_emails(readers=pending, **options):
+        yield reader, result
+        journal.record(reader.identifier)
@@ -0,0 +1,219 @@
+'''
+    Command line interface of Tsidii
+
+        tsidii render --body body.html --readers readers.jsonl --output emails/
+        tsidii render --body body.html --readers readers.csv --output emails.mbox --from news@example.com
+
+    Modules other than the standard library are imported by the command
+    that needs them, so starting up stays fast.
+'''
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import quote
+
+_FROM_LINE = re.compile(rb"^(>*From )", re.MULTILINE)
+
+
+class Progress(object):
+    '''
+        Counts rendered emails and reports the throughput on a stream
+        every interval seconds
+    '''
+
+    def __init__(self, stream, interval=None, clock=time.perf_counter):
+        self.stream = stream
+        self.interval = interval
+        self.clock = clock
+        self.count = 0
+        self.started = clock()
+        self._reported = self.started
+
+    def update(self, count=1):
+        self.count += count
+        if self.interval is None:
+            return
+        now = self.clock()
+        if now - self._reported >= self.interval:
+            self._reported = now
+            self.report(now)
+
+    def report(self, now=None):
+        if now is None:
+            now = self.clock()
+        seconds = now - self.started
+        self.stream.write("Rendered {} emails in {:.2f}s ({:.0f}/s)\n".format(
+            self.count,
+            seconds,
+            self.count / seconds if seconds else 0
+        ))
+        self.stream.flush()
+
+
+def load_readers(path, compact=False):
+    '''
+        Loads readers from a .jsonl, .csv or .json file
+
+        :param string path: File of readers
+        :param bool compact: Load into a CompactReaderCollection
+        :return ReaderCollection: The loaded readers
+    '''
+    from tsidii.reader import ReaderCollection, CompactReaderCollection
+    collection_class = CompactReaderCollection if compact else ReaderCollection
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as fp:
+        if extension == ".jsonl":
+            return collection_class.from_jsonl(fp)
+        if extension == ".csv":
+            return collection_class.from_csv(fp)
+        if extension == ".json":
+            return collection_class.from_json(fp)
+    raise ValueError("Readers must be a .jsonl, .csv or .json file, not '{}'".format(path))
+
+
+def shard_option(value):
+    try:
+        shard, num_shards = [int(number) for number in value.split("/")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("Shards are given as INDEX/COUNT, not '{}'".format(value))
+    if not 0 <= shard < num_shards:
+        raise argparse.ArgumentTypeError("Shard index must be below the shard count")
+    return shard, num_shards
+
+
+def output_format(output):
+    if output == "-" or output.endswith(".jsonl"):
+        return "jsonl"
+    if output.endswith(".mbox"):
+        return "mbox"
+    return "dir"
+
+
+def file_name(identifier):
+    '''
+        :param string identifier: Identifier of a reader
+        :return string: File name of the reader's email in an output directory
+    '''
+    name = quote(identifier, safe="")
+    if name.startswith("."):
+        name = "%2E" + name[1:]
+    return name + ".html"
+
+
+def write_directory(emails, directory, progress):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for reader, (message, _) in emails:
+        with open(os.path.join(directory, file_name(reader.identifier)), "w",
+                  encoding="utf-8") as fp:
+            fp.write(message)
+        progress.update()
+
+
+def write_jsonl(emails, fp, progress):
+    for reader, (message, private) in emails:
+        fp.write(json.dumps({
+            "identifier": reader.identifier,
+            "email": reader.email,
+            "private": private,
+            "body": message
+        }))
+        fp.write("\n")
+        progress.update()
+
+
+def write_mbox(emails, fp, builder, progress):
+    from email.utils import parseaddr
+    sender = parseaddr(builder.from_addr)[1] or "MAILER-DAEMON"
+    separator = "From {} {}\n".format(sender, time.asctime(time.gmtime())).encode("utf-8")
+    for reader, result in emails:
+        fp.write(separator)
+        # Lines that look like a separator are quoted as in mboxrd
+        fp.write(_FROM_LINE.sub(rb">\1", builder.build_bytes(reader, result)))
+        fp.write(b"\n")
+        progress.update()
+
+
+def render(args):
+    from tsidii.email import TsidiiEmail
+    from tsidii.parser import HTMLParser
+    from tsidii.scanner import NoteScanner
+
+    kind = args.format or output_format(args.output)
+    if kind == "mbox" and args.from_addr is None:
+        raise ValueError("mbox output needs a --from address")
+    with open(args.body, encoding="utf-8") as fp:
+        body = fp.read()
+    if args.shard is None:
+        readers = load_readers(args.readers, compact=args.compact)
+    else:
+        from tsidii.reader import ReaderCollection, CompactReaderCollection
+        from tsidii.sharding import load_shard
+        with open(args.readers, encoding="utf-8") as fp:
+            readers = load_shard(
+                fp, args.shard[0], args.shard[1],
+                CompactReaderCollection if args.compact else ReaderCollection
+            )
+    parser = NoteScanner() if args.parser == "scanner" else HTMLParser()
+    emails = TsidiiEmail(body, readers, parser).reader_emails(
+        workers=args.workers, chunk_size=args.chunk_size
+    )
+    progress = Progress(sys.stderr, args.progress)
+    if kind == "dir":
+        write_directory(emails, args.output, progress)
+    elif kind == "jsonl" and args.output == "-":
+        write_jsonl(emails, sys.stdout, progress)
+    elif kind == "jsonl":
+        with open(args.output, "w", encoding="utf-8") as fp:
+            write_jsonl(emails, fp, progress)
+    else:
+        from email import policy
+        from tsidii.mime import MessageBuilder
+        builder = MessageBuilder(args.from_addr, args.subject, policy=policy.default)
+        with open(args.output, "wb") as fp:
+            write_mbox(emails, fp, builder, progress)
+    if not args.quiet:
+        progress.report()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tsidii", description="Tsidii Email Content Manager")
+    commands = parser.add_subparsers(dest="command")
+    command = commands.add_parser("render", help="Parse an email for every reader")
+    command.add_argument("--body", required=True, help="HTML file of the email body")
+    command.add_argument("--readers", required=True, help="Readers as .jsonl, .csv or .json")
+    command.add_argument("--output", default="-",
+                         help="Directory, .jsonl or .mbox file, - for JSON lines on stdout")
+    command.add_argument("--format", choices=["dir", "jsonl", "mbox"],
+                         help="Output format, guessed from --output by default")
+    command.add_argument("--parser", choices=["html", "scanner"], default="html")
+    command.add_argument("--compact", action="store_true",
+                         help="Keep readers in a CompactReaderCollection")
+    command.add_argument("--shard", type=shard_option, metavar="INDEX/COUNT",
+                         help="Only parse the readers of one shard of a .json or .jsonl file")
+    command.add_argument("--workers", type=int, help="Parse in this many processes")
+    command.add_argument("--chunk-size", type=int, default=256,
+                         help="Readers sent to a worker at a time")
+    command.add_argument("--from", dest="from_addr", help="Sender address of mbox messages")
+    command.add_argument("--subject", default="", help="Subject of mbox messages")
+    command.add_argument("--progress", type=float, metavar="SECONDS",
+                         help="Report the throughput every SECONDS")
+    command.add_argument("--quiet", action="store_true", help="Don't print a summary")
+    command.set_defaults(handler=render)
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as error:
+        sys.stderr.write("tsidii: error: {}\n".format(error))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import os
+import hashlib
+
+
+class BodyStore(object):
+    '''
+        Content addressed store of rendered bodies. Every body is kept once
+        under the SHA-256 of its UTF-8 encoding, readers that get the same
+        email share a reference to it.
+    '''
+    suffix = ".html"
+
+    def __init__(self):
+        self._bodies = {}
+        self._sizes = {}
+        self.references = 0
+        self.referenced_bytes = 0
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def __contains__(self, ref):
+        return ref in self._bodies
+
+    def __iter__(self):
+        return iter(self._bodies)
+
+    @classmethod
+    def load(cls, directory):
+        '''
+            Creates a store from the bodies written by dump
+
+            :param string directory: Directory given to dump
+            :return BodyStore: The loaded store
+        '''
+        store = cls()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(cls.suffix):
+                continue
+            with open(os.path.join(directory, name), "rb") as fp:
+                data = fp.read()
+            ref = name[:-len(cls.suffix)]
+            if hashlib.sha256(data).hexdigest() != ref:
+                raise ValueError("'{}' does not match its reference".format(name))
+            store._bodies[ref] = data.decode("utf-8")
+            store._sizes[ref] = len(data)
+        return store
+
+    def put(self, body):
+        '''
+            Adds a body and counts a reference to it
+
+            :param string body: Rendered body
+            :return string: Reference of the body
+        '''
+        if not isinstance(body, str):
+            raise ValueError(
+                "Body must be a string, not a '{}'".format(type(body))
+            )
+        data = body.encode("utf-8")
+        ref = hashlib.sha256(data).hexdigest()
+        if ref not in self._bodies:
+            self._bodies[ref] = body
+            self._sizes[ref] = len(data)
+        self.add_reference(ref)
+        return ref
+
+    def add_reference(self, ref):
+        '''
+            Counts another reader of a body that is already stored
+
+            :param string ref: Reference returned by put
+        '''
+        self.references += 1
+        self.referenced_bytes += self._sizes[ref]
+
+    def get(self, ref):
+        '''
+            :param string ref: Reference returned by put
+            :return string: The body or None
+        '''
+        return self._bodies.get(ref)
+
+    def dump(self, directory):
+        '''
+            Writes every body to a file named after its reference, bodies
+            that are already in the directory are not written again
+
+            :param string directory: Directory to write to, created if missing
+            :return int: Number of files written
+        '''
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        written = 0
+        for ref, body in self._bodies.items():
+            path = os.path.join(directory, ref + self.suffix)
+            if os.path.exists(path):
+                continue
+            with open(path, "wb") as fp:
+                fp.write(body.encode("utf-8"))
+            written += 1
+        return written
+
+    def stats(self):
+        '''
+            :return dict: Unique bodies, references and bytes with and without deduplication
+        '''
+        return {
+            "bodies": len(self._bodies),
+            "references": self.references,
+            "bytes": sum(self._sizes.values()),
+            "referenced_bytes": self.referenced_bytes
+        }
@@ -0,0 +1,180 @@
+import smtplib
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+DeliveryReport = namedtuple("DeliveryReport", ["sent", "failures"])
+
+
+def build_message(reader, result, from_addr, subject):
+    '''
+        Creates the HTML message for a parsed email
+
+        :param TsidiiReader reader: Reader the email is addressed to
+        :param tuple result: The parsed message and private flag
+        :param string from_addr: Sender address
+        :param string subject: Subject of the email
+        :return EmailMessage: The message
+    '''
+    message = EmailMessage()
+    message["From"] = from_addr
+    message["To"] = reader.email
+    message["Subject"] = subject
+    message.set_content(result[0], subtype="html")
+    return message
+
+
+class SMTPPool(object):
+    '''
+        Pool of persistent SMTP connections. Connections are opened when
+        needed, reused for up to messages_per_connection messages and
+        replaced when they break.
+    '''
+
+    def __init__(self, host="localhost", port=25, size=4,
+                 messages_per_connection=100, timeout=30, starttls=False,
+                 username=None, password=None, connection_factory=smtplib.SMTP):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        if messages_per_connection < 1:
+            raise ValueError("Messages per connection must be at least 1")
+        self.host = host
+        self.port = port
+        self.size = size
+        self.messages_per_connection = messages_per_connection
+        self.timeout = timeout
+        self.starttls = starttls
+        self.username = username
+        self.password = password
+        self.connection_factory = connection_factory
+        self.opened = 0
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.Semaphore(size)
+
+    def send(self, message, from_addr, to_addrs):
+        '''
+            Sends a message over a pooled connection. A connection that
+            fails is closed and not returned to the pool.
+        '''
+        self._available.acquire()
+        try:
+            connection, sent = self._acquire()
+            try:
+                connection.send_message(message, from_addr, to_addrs)
+            except smtplib.SMTPRecipientsRefused:
+                # The connection itself is still usable
+                self._release(connection, sent + 1)
+                raise
+            except Exception:
+                self._discard(connection)
+                raise
+            self._release(connection, sent + 1)
+        finally:
+            self._available.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self.opened += 1
+        connection = self.connection_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                connection.starttls()
+            if self.username is not None:
+                connection.login(self.username, self.password)
+        except Exception:
+            self._discard(connection)
+            raise
+        return connection, 0
+
+    def _release(self, connection, sent):
+        if sent >= self.messages_per_connection:
+            self._discard(connection)
+            return
+        with self._lock:
+            self._idle.append((connection, sent))
+
+    def _discard(self, connection):
+        try:
+            connection.quit()
+        except Exception:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+def _is_permanent(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(error, "smtp_code", None)
+    return code is not None and code >= 500
+
+
+def deliver(email, pool, from_addr, subject, retries=3, backoff=0.5,
+            build=build_message, sleep=time.sleep, **options):
+    '''
+        Sends every parsed email of a TsidiiEmail to the email address of
+        its reader. Each connection of the pool sends from its own thread,
+        temporary failures are retried with exponential backoff and
+        permanent failures are reported per reader.
+
+        :param TsidiiEmail email: The email to send
+        :param SMTPPool pool: Connections to send over
+        :param string from_addr: Sender address
+        :param string subject: Subject of the email
+        :param int retries: Times a failed message is sent again
+        :param float backoff: Seconds before the first retry, doubled every retry
+        :param function build: Called as build(reader, result, from_addr, subject)
+        :param options: Keyword arguments for TsidiiEmail.reader_emails
+        :return DeliveryReport: Identifiers sent and errors by identifier
+    '''
+    sent = []
+    failures = {}
+    lock = threading.Lock()
+    # Keeps the threads busy without parsing far ahead of the senders
+    in_flight = threading.Semaphore(pool.size * 2)
+
+    def send(reader, result):
+        try:
+            message = build(reader, result, from_addr, subject)
+            attempt = 0
+            while True:
+                try:
+                    pool.send(message, from_addr, [reader.email])
+                    break
+                except (smtplib.SMTPException, OSError) as error:
+                    if attempt >= retries or _is_permanent(error):
+                        raise
+                    sleep(backoff * 2 ** attempt)
+                    attempt += 1
+        except Exception as error:
+            with lock:
+                failures[reader.identifier] = error
+        else:
+            with lock:
+                sent.append(reader.identifier)
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        for reader, result in email.reader_emails(**options):
+            in_flight.acquire()
+            executor.submit(send, reader, result)
+    return DeliveryReport(sent, failures)
@@ -1,8 +1,17 @@
-from tsidii.parser import HTMLParser
+from collections import OrderedDict
+
+from tsidii.analytics import audience_report
+from tsidii.dedup import BodyStore
+from tsidii.incremental import rerender
+from tsidii.parallel import parallel_reader_emails
+from tsidii.parser import BaseParser, HTMLParser
 from tsidii.reader import ReaderCollection
+from tsidii.render import iter_chunks, reader_parts
 
 
 class TsidiiEmail(object):
+    # Number of readers whose note actions are decided together
+    batch_size = 1024
 
     def __init__(self, body, recipients, parser=None):
         if not isinstance(body, str):
@@ -13,8 +22,171 @@ class TsidiiEmail(object):
         self.recipients = recipients
         if parser is None:
             parser = HTMLParser()
+        elif not isinstance(parser, BaseParser):
+            raise ValueError("Parser must be an instance of BaseParser")
         self.parser = parser
+        self.class_count = 0
+        self.body_store = None
+
+    def reader_emails(self, workers=None, chunk_size=256, ordered=True,
+                      max_in_flight=None, stats=None, readers=None):
+        '''
+            Yields every reader with their parsed email. Readers that see the
+            same notes share a single render, only the private note prefix is
+            filled in per reader.
+
+            :param int workers: Parse in this many processes [optional]
+            :param int chunk_size: Readers sent to a worker at a time
+            :param bool ordered: Keep reader order when using workers
+            :param int max_in_flight: Chunks pending at once when using workers
+            :param RenderStats stats: Collect timers and counters [optional]
+            :param iterable readers: Only parse these readers instead of every recipient [optional]
+            :return generator: (TsidiiReader, (message, private flag)) tuples
+        '''
+        if readers is None:
+            readers = self.recipients
+        if workers is not None:
+            if stats is not None:
+                raise ValueError("Stats can't be collected when using workers")
+            return self._parallel_reader_emails(
+                readers,
+                workers=workers,
+                chunk_size=chunk_size,
+                ordered=ordered,
+                max_in_flight=max_in_flight
+            )
+        if stats is not None:
+            return self._instrumented_reader_emails(readers, stats)
+        return self._reader_emails(readers)
+
+    def _reader_parts(self, readers, stats=None):
+        # Readers with the resolved parts of their audience class
+        start = stats.clock() if stats is not None else None
+        compiled = self.parser.compile(self.body)
+        index = self.parser.audience_index(compiled)
+        if stats is not None:
+            stats.add_time("compile", stats.clock() - start)
+        classes = {}
+        self.class_count = 0
+        for reader, actions, parts in reader_parts(
+                compiled, index.actions, readers, self.batch_size, classes,
+                stats):
+            self.class_count = len(classes)
+            yield reader, actions, parts
+
+    def _parallel_reader_emails(self, readers, **options):
+        classes = set()
+        self.class_count = 0
+        for item in parallel_reader_emails(
+                self.body, readers, self.parser, classes=classes, **options):
+            self.class_count = len(classes)
+            yield item
+
+    def _reader_emails(self, readers):
+        for reader, _, parts in self._reader_parts(readers):
+            yield reader, self.parser.fill(parts, reader)
+
+    def deduplicated_emails(self, store=None):
+        '''
+            Yields every reader with a reference to their parsed email in a
+            BodyStore, every distinct email is stored once. Emails are told
+            apart by the notes a reader sees and the private note prefix,
+            so each distinct email is only filled and hashed once.
+
+            :param BodyStore store: Store to add the emails to, kept as body_store [optional]
+            :return generator: (TsidiiReader, body reference, private flag) tuples
+        '''
+        if store is None:
+            store = BodyStore()
+        self.body_store = store
+        return self._deduplicated_emails(store)
+
+    def _deduplicated_emails(self, store):
+        refs = {}
+        for reader, actions, parts in self._reader_parts(self.recipients):
+            if len(parts) == 1:
+                key = (actions, None)
+            else:
+                key = (actions, self.parser.private_prefix(reader))
+            ref = refs.get(key)
+            if ref is None:
+                message, private = self.parser.fill(parts, reader)
+                ref = refs[key] = (store.put(message), private)
+            else:
+                store.add_reference(ref[0])
+            yield reader, ref[0], ref[1]
+
+    def _instrumented_reader_emails(self, readers, stats):
+        clock = stats.clock
+        for reader, actions, parts in self._reader_parts(readers, stats):
+            start = clock()
+            result = self.parser.fill(parts, reader)
+            stats.add_time("serialize", clock() - start)
+            stats.reader_done(reader, actions, result[0], result[1])
+            start = clock()
+            yield reader, result
+            stats.add_time("consumer", clock() - start)
+
+    def rerender(self, body, previous):
+        '''
+            Replaces the body with an edited version and parses the emails
+            again, only readers whose email changed are parsed, the others
+            get their previous email back.
+
+            :param string body: The edited body
+            :param dict previous: (message, private flag) by reader identifier
+            :return generator: (TsidiiReader, (message, private flag), changed) tuples
+        '''
+        if not isinstance(body, str):
+            raise ValueError("Email body must be a string")
+        old_compiled = self.parser.compile(self.body)
+        new_compiled = self.parser.compile(body)
+        self.body = body
+        return rerender(
+            self.parser, old_compiled, new_compiled, self.recipients, previous,
+            batch_size=self.batch_size
+        )
+
+    def areader_emails(self, **options):
+        '''
+            Async iterator over the parsed emails, see tsidii.aio.areader_emails
+
+            :return async generator: (TsidiiReader, (message, private flag)) tuples
+        '''
+        from tsidii.aio import areader_emails
+        return areader_emails(self, **options)
+
+    def adeliver(self, sink, concurrency=10, **options):
+        '''
+            Hands every parsed email to an async sink, see tsidii.aio.adeliver
+
+            :return coroutine: Resolves to a SinkResult
+        '''
+        from tsidii.aio import adeliver
+        return adeliver(self, sink, concurrency=concurrency, **options)
+
+    def audience_report(self):
+        '''
+            Counts who sees every note without parsing any email, see
+            tsidii.analytics.audience_report
+
+            :return AudienceReport: Audience of every note
+        '''
+        return audience_report(
+            self.parser, self.parser.compile(self.body), self.recipients
+        )
+
+    def audience_classes(self):
+        '''
+            Groups the recipients by the notes they are able to see
 
-    def reader_emails(self):
-        for reader in self.recipients:
-            yield reader, self.parser.parse_reader_email(self.body, reader)
+            :return OrderedDict: Note actions mapped to the list of readers
+        '''
+        compiled = self.parser.compile(self.body)
+        index = self.parser.audience_index(compiled)
+        classes = OrderedDict()
+        for readers in iter_chunks(self.recipients, self.batch_size):
+            for reader, actions in zip(readers, index.actions(readers)):
+                classes.setdefault(actions, []).append(reader)
+        self.class_count = len(classes)
+        return classes
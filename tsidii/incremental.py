@@ -0,0 +1,123 @@
+from tsidii.render import iter_chunks, reader_parts
+from tsidii.template import NoteSegment, DECOMPOSE
+
+
+class BodyDiff(object):
+    '''
+        Differences between two compiled bodies at the note level
+
+        compatible - the bodies have the same notes and the same text
+            outside of notes, only then are the sets below meaningful
+        changed_notes - indexes of notes whose own text changed
+        audience_notes - indexes of notes whose audiences changed
+    '''
+
+    def __init__(self, compatible, changed_notes=None, audience_notes=None):
+        self.compatible = compatible
+        self.changed_notes = changed_notes or set()
+        self.audience_notes = audience_notes or set()
+
+    def reader_changed(self, old_actions, new_actions):
+        '''
+            :param tuple old_actions: Note actions of a reader for the old body
+            :param tuple new_actions: Note actions of the reader for the new body
+            :return bool: Whether the email of the reader changed
+        '''
+        if not self.compatible:
+            return True
+        if self.audience_notes and old_actions != new_actions:
+            return True
+        for index in self.changed_notes:
+            if new_actions[index] != DECOMPOSE:
+                return True
+        return False
+
+
+def diff_bodies(old, new):
+    '''
+        Compares two compiled bodies note by note
+
+        :param CompiledBody old: The body before the edit
+        :param CompiledBody new: The body after the edit
+        :return BodyDiff: The notes that changed
+    '''
+    changed_notes = set()
+    audience_notes = set()
+    if len(old.notes) != len(new.notes):
+        return BodyDiff(False)
+    compatible = _compare(old.segments, new.segments, None, changed_notes, audience_notes)
+    if not compatible:
+        return BodyDiff(False)
+    return BodyDiff(True, changed_notes, audience_notes)
+
+
+def _text_runs(segments):
+    runs = [[]]
+    notes = []
+    for segment in segments:
+        if isinstance(segment, NoteSegment):
+            notes.append(segment)
+            runs.append([])
+        else:
+            runs[-1].append(segment)
+    return ["".join(run) for run in runs], notes
+
+
+def _audience(note):
+    return (bool(note.attrs), note.message, note.hidden, note.private, note.has_hidden)
+
+
+def _compare(old_segments, new_segments, owner, changed_notes, audience_notes):
+    old_runs, old_notes = _text_runs(old_segments)
+    new_runs, new_notes = _text_runs(new_segments)
+    if len(old_notes) != len(new_notes):
+        return False
+    if old_runs != new_runs:
+        if owner is None:
+            return False
+        changed_notes.add(owner)
+    for old_note, new_note in zip(old_notes, new_notes):
+        if old_note.index != new_note.index:
+            return False
+        if _audience(old_note) != _audience(new_note):
+            audience_notes.add(new_note.index)
+        if not _compare(old_note.children, new_note.children, new_note.index,
+                        changed_notes, audience_notes):
+            return False
+    return True
+
+
+def rerender(parser, old_compiled, new_compiled, recipients, previous,
+             batch_size=1024):
+    '''
+        Parses the emails of an edited body, reusing the previous email of
+        every reader whose email is not affected by the edit
+
+        :param BaseParser parser: Parser that compiled both bodies
+        :param CompiledBody old_compiled: The body before the edit
+        :param CompiledBody new_compiled: The body after the edit
+        :param ReaderCollection recipients: Readers to parse the email for
+        :param dict previous: Previous (message, private flag) by identifier
+        :param int batch_size: Readers whose note actions are decided together
+        :return generator: (TsidiiReader, (message, private flag), changed) tuples
+    '''
+    diff = diff_bodies(old_compiled, new_compiled)
+    new_index = parser.audience_index(new_compiled)
+    old_index = None
+    if diff.audience_notes:
+        old_index = parser.audience_index(old_compiled)
+    classes = {}
+    for readers in iter_chunks(recipients, batch_size):
+        old_actions = None
+        if old_index is not None:
+            old_actions = old_index.actions(readers)
+        resolved = reader_parts(
+            new_compiled, new_index.actions, readers, len(readers), classes
+        )
+        for position, (reader, new, parts) in enumerate(resolved):
+            old = new if old_actions is None else old_actions[position]
+            result = previous.get(reader.identifier)
+            if result is not None and not diff.reader_changed(old, new):
+                yield reader, result, False
+                continue
+            yield reader, parser.fill(parts, reader), True
@@ -0,0 +1,178 @@
+import re
+from collections import OrderedDict
+from email import policy as email_policy
+from email.generator import BytesGenerator
+from email.message import EmailMessage, MIMEPart
+from html.parser import HTMLParser as _HTMLTokenizer
+from io import BytesIO
+
+_BLOCK_TAGS = frozenset([
+    "address", "article", "blockquote", "br", "dd", "div", "dl", "dt",
+    "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li",
+    "ol", "p", "pre", "section", "table", "tr", "ul"
+])
+_SKIPPED_TAGS = frozenset(["head", "script", "style", "title"])
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\n\s*\n\s*(?:\n\s*)+")
+
+
+class _TextExtractor(_HTMLTokenizer):
+
+    def __init__(self):
+        _HTMLTokenizer.__init__(self, convert_charrefs=True)
+        self.chunks = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in _BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in _BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.chunks.append(data.replace("\n", " "))
+
+
+def html_to_text(body):
+    '''
+        Creates the plain text version of an HTML body. Block elements
+        become line breaks, scripts and styles are dropped.
+
+        :param string body: HTML body
+        :return string: The text of the body
+    '''
+    extractor = _TextExtractor()
+    extractor.feed(body)
+    extractor.close()
+    lines = [
+        _SPACES.sub(" ", line).strip()
+        for line in "".join(extractor.chunks).split("\n")
+    ]
+    text = _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+    return text + "\n" if text else ""
+
+
+class MessageBuilder(object):
+    '''
+        Builds the messages of parsed emails. The headers shared by every
+        message are encoded once, and the MIME parts of an HTML body,
+        including its plain text alternative, are built once per distinct
+        body and shared by every message that uses it.
+    '''
+
+    def __init__(self, from_addr, subject, headers=None, text=True,
+                 max_entries=256, policy=email_policy.SMTP):
+        if max_entries < 1:
+            raise ValueError("Max entries must be at least 1")
+        self.from_addr = from_addr
+        self.subject = subject
+        self.text = text
+        self.max_entries = max_entries
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self._before_to = [("From", from_addr)]
+        self._after_to = [("Subject", subject)]
+        self._after_to.extend((headers or {}).items())
+        self._after_to.append(("MIME-Version", "1.0"))
+        self._head = self._header_bytes(self._before_to)
+        self._tail = self._header_bytes(self._after_to)
+        self._bodies = OrderedDict()
+
+    def build_message(self, reader, result):
+        '''
+            :param TsidiiReader reader: Reader the email is addressed to
+            :param tuple result: The parsed message and private flag
+            :return EmailMessage: The message
+        '''
+        template, _, payload = self._template(result[0])
+        message = EmailMessage(policy=self.policy)
+        for name, value in self._before_to:
+            message[name] = value
+        message["To"] = reader.email
+        for name, value in self._after_to:
+            message[name] = value
+        for name, value in template.items():
+            message[name] = value
+        if template.is_multipart():
+            for part in template.iter_parts():
+                message.attach(part)
+        else:
+            message.set_payload(payload)
+        return message
+
+    def build_bytes(self, reader, result):
+        '''
+            :param TsidiiReader reader: Reader the email is addressed to
+            :param tuple result: The parsed message and private flag
+            :return bytes: The message as sent over SMTP
+        '''
+        return b"".join([
+            self._head,
+            self._header_bytes([("To", reader.email)]),
+            self._tail,
+            self._template(result[0])[1]
+        ])
+
+    def messages(self, email, raw=False, **options):
+        '''
+            Builds the messages of a TsidiiEmail one reader at a time
+
+            :param TsidiiEmail email: The email to build messages for
+            :param bool raw: Yield bytes instead of EmailMessage objects
+            :param options: Keyword arguments for TsidiiEmail.reader_emails
+            :return generator: (TsidiiReader, message) tuples
+        '''
+        build = self.build_bytes if raw else self.build_message
+        for reader, result in email.reader_emails(**options):
+            yield reader, build(reader, result)
+
+    def _header_bytes(self, headers):
+        # Parsed first so that non ASCII values are encoded
+        return b"".join(
+            self.policy.fold_binary(*self.policy.header_store_parse(name, value))
+            for name, value in headers
+        )
+
+    def _template(self, body):
+        entry = self._bodies.get(body)
+        if entry is not None:
+            self.hits += 1
+            self._bodies.move_to_end(body)
+            return entry
+        self.misses += 1
+        html = MIMEPart(policy=self.policy)
+        html.set_content(body, subtype="html")
+        if self.text:
+            template = MIMEPart(policy=self.policy)
+            template["Content-Type"] = "multipart/alternative"
+            text = MIMEPart(policy=self.policy)
+            text.set_content(html_to_text(body))
+            template.attach(text)
+            template.attach(html)
+            payload = None
+        else:
+            template = html
+            if html["Content-Transfer-Encoding"] == "8bit":
+                # The text payload of an 8bit part is decoded again on access
+                payload = html.get_payload(decode=True)
+            else:
+                payload = html.get_payload()
+        fp = BytesIO()
+        # Also picks the boundary, which is then shared by every message
+        BytesGenerator(fp, policy=self.policy).flatten(template)
+        entry = self._bodies[body] = (template, fp.getvalue(), payload)
+        if len(self._bodies) > self.max_entries:
+            self._bodies.popitem(last=False)
+        return entry
@@ -0,0 +1,121 @@
+import os
+from collections import deque
+from itertools import islice
+
+from tsidii.render import iter_chunks, reader_parts
+
+# State of a worker process, set up once by _init_worker
+_worker = {}
+
+
+class ReaderRenderError(ValueError):
+    '''
+        Raised when the email of a single reader could not be parsed
+    '''
+
+    def __init__(self, identifier, error):
+        super(ReaderRenderError, self).__init__(
+            "Failed to parse email for reader '{}': {}".format(identifier, error)
+        )
+        self.identifier = identifier
+        self.error = error
+
+
+def _init_worker(body, parser):
+    _worker["parser"] = parser
+    _worker["compiled"] = parser.compile(body)
+    _worker["index"] = parser.audience_index(_worker["compiled"])
+    _worker["classes"] = {}
+
+
+def _render_chunk(readers):
+    known = len(_worker["classes"])
+    try:
+        results = _render(readers)
+    except Exception:
+        # Find the readers that fail by parsing them one at a time
+        results = []
+        for reader in readers:
+            try:
+                results.extend(_render([reader]))
+            except Exception as error:
+                results.append((False, "{}: {}".format(type(error).__name__, error)))
+    # Audience classes this worker resolved for the first time
+    return results, list(islice(_worker["classes"], known, None))
+
+
+def _render(readers):
+    parser = _worker["parser"]
+    return [
+        (True, parser.fill(parts, reader))
+        for reader, _, parts in reader_parts(
+            _worker["compiled"], _worker["index"].actions, readers, len(readers),
+            _worker["classes"]
+        )
+    ]
+
+
+def _chunk_results(chunk, results):
+    for reader, (success, result) in zip(chunk, results):
+        if not success:
+            raise ReaderRenderError(reader.identifier, result)
+        yield reader, result
+
+
+def parallel_reader_emails(body, recipients, parser, workers=None,
+                           chunk_size=256, ordered=True, max_in_flight=None,
+                           classes=None):
+    '''
+        Parses the emails of all recipients in a pool of worker processes.
+        The body and parser are sent to every worker once, readers are sent
+        in chunks and at most max_in_flight chunks are pending at a time.
+
+        :param string body: The message to be parsed
+        :param ReaderCollection recipients: Readers to parse the message for
+        :param HTMLParser parser: Parser used by the workers
+        :param int workers: Number of worker processes, defaults to the CPU count
+        :param int chunk_size: Number of readers sent to a worker at a time
+        :param bool ordered: Yield in reader order instead of completion order
+        :param int max_in_flight: Chunks pending at once, defaults to twice the workers
+        :param set classes: Receives the note actions of every audience class [optional]
+        :return generator: (TsidiiReader, (message, private flag)) tuples
+    '''
+    # Loading multiprocessing is slow and only needed with workers
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be at least 1")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(body, parser)
+    )
+    if max_in_flight is None:
+        max_in_flight = workers * 2
+    max_in_flight = max(1, max_in_flight)
+    chunks = iter_chunks(recipients, chunk_size)
+    pending = deque()
+    try:
+        for chunk in islice(chunks, max_in_flight):
+            pending.append((executor.submit(_render_chunk, chunk), chunk))
+        while pending:
+            if ordered:
+                future, chunk = pending.popleft()
+            else:
+                done, _ = wait([item[0] for item in pending], return_when=FIRST_COMPLETED)
+                future, chunk = next(item for item in pending if item[0] in done)
+                pending.remove((future, chunk))
+            results, new_classes = future.result()
+            if classes is not None:
+                classes.update(new_classes)
+            for chunk_to_submit in islice(chunks, 1):
+                pending.append(
+                    (executor.submit(_render_chunk, chunk_to_submit), chunk_to_submit)
+                )
+            for item in _chunk_results(chunk, results):
+                yield item
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
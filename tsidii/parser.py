@@ -1,24 +1,41 @@
-from bs4 import BeautifulSoup
+import re
+import html
+import uuid
+from abc import ABC, abstractmethod
 
+from tsidii.cache import get_default_cache
 from tsidii.reader import TsidiiReader
+from tsidii.template import (
+    CompiledBody, NoteSegment, DECOMPOSE, UNWRAP, PRIVATE
+)
+from tsidii.visibility import AudienceIndex, audience_tokens
 
 
-class HTMLParser(object):
-    # Should inherit from abstract base class to allow for easy modification
+class BaseParser(ABC):
+    '''
+        Base class of the parsers used by TsidiiEmail. A parser compiles a
+        body into a CompiledBody, rendering and note evaluation are shared.
+        Compiled bodies are kept in the process wide TemplateCache unless
+        another cache, or False for no cache, is given.
+    '''
 
-    def __init__(self, note_tag="note"):
+    def __init__(self, note_tag="note", cache=None):
         self.note_tag = note_tag
         self.message_tag = "message"
         self.hidden_tag = "hidden"
         self.private_tag = "private"
+        if cache is None:
+            cache = get_default_cache()
+        self.cache = cache
 
-    def parse_reader_email(self, body, reader):
+    def parse_reader_email(self, body, reader, stats=None):
         '''
             Parses a body that has HTML in it that matches up with the format
             specified (undocumented currently) for Tsidii Emails.
 
             :param string body: The message to be parsed
             :param TsidiiReader reader: TsidiiReader Instance to parse message with
+            :param RenderStats stats: Collect timers and counters [optional]
             :return tuple: The parsed message as well as flag indicating private message
         '''
         if not isinstance(body, str):
@@ -29,35 +46,233 @@ class HTMLParser(object):
             raise ValueError(
                 "Reader must be an instance of TsidiiReader"
             )
-        soup = BeautifulSoup(body)
-        note_tags = soup.findAll(self.note_tag)
-        pm = False
-        if note_tags is not None:
-            for tag in note_tags:
-                if not tag.attrs:
-                    tag.decompose()
-                    continue
-                if tag.get(self.hidden_tag) and not self._user_flag_in_tag(reader, tag.get(self.hidden_tag)):
-                    # Unwrap tag if user flag is not in in hidden attributes
-                    tag.unwrap()
-                elif self._user_flag_in_tag(reader, tag.get(self.private_tag)):
-                    # Append Name then unwrap tag
-                    tag.insert_before(
-                        " {} - ".format(reader.first_name.title())
-                    )
-                    tag.unwrap()
-                    pm = True
-                elif self._user_flag_in_tag(reader, tag.get(self.message_tag)):
-                    # Unwrap tag if user is flagged in the tag
-                    tag.unwrap()
-                else:
-                    tag.decompose()
-        soup = str(soup)
-        return (soup, pm)
-
-    def _user_flag_in_tag(self, reader, tag_attrs):
-        if not tag_attrs:
+        if stats is None:
+            return self.render(self.compile(body), reader)
+        clock = stats.clock
+        start = clock()
+        compiled = self.compile(body)
+        stats.add_time("compile", clock() - start)
+        start = clock()
+        actions = self.note_actions(compiled, reader)
+        stats.add_time("evaluate", clock() - start)
+        start = clock()
+        result = self.fill(compiled.resolve(actions), reader)
+        stats.add_time("serialize", clock() - start)
+        stats.reader_done(reader, actions, result[0], result[1])
+        return result
+
+    def compile(self, body):
+        '''
+            Parses a body once into static text and note segments so that it
+            can be rendered for many readers without parsing it again.
+
+            :param string body: The message to be compiled
+            :return CompiledBody: The compiled message
+        '''
+        if not isinstance(body, str):
+            raise ValueError(
+                "Body must be a string, not a '{}'".format(type(body))
+            )
+        if self.cache is not False:
+            return self.cache.compile(self, body)
+        return self.compile_body(body)
+
+    def compile_stream(self, chunks):
+        '''
+            Compiles a body that is given in pieces. The pieces are joined
+            and compiled as a whole unless the parser is able to scan them
+            one at a time.
+
+            :param iterable<string> chunks: The message in order
+            :return CompiledBody: The compiled message
+        '''
+        body = []
+        for chunk in chunks:
+            if not isinstance(chunk, str):
+                raise ValueError(
+                    "Body chunks must be strings, not a '{}'".format(type(chunk))
+                )
+            body.append(chunk)
+        return self.compile("".join(body))
+
+    def config(self):
+        '''
+            :return tuple: Everything about the parser that changes how a body is compiled
+        '''
+        return (
+            type(self).__module__,
+            type(self).__name__,
+            self.note_tag,
+            self.message_tag,
+            self.hidden_tag,
+            self.private_tag
+        )
+
+    @abstractmethod
+    def compile_body(self, body):
+        '''
+            Compiles a body that has already been validated
+
+            :param string body: The message to be compiled
+            :return CompiledBody: The compiled message
+        '''
+
+    def render(self, compiled, reader):
+        '''
+            Renders a compiled body for a single reader
+
+            :param CompiledBody compiled: Body returned by compile
+            :param TsidiiReader reader: TsidiiReader Instance to render message with
+            :return tuple: The parsed message as well as flag indicating private message
+        '''
+        return self.fill(
+            compiled.resolve(self.note_actions(compiled, reader)), reader
+        )
+
+    def fill(self, parts, reader):
+        '''
+            Inserts the private note prefix of a reader into a resolved body
+
+            :param list<string> parts: Body returned by CompiledBody.resolve
+            :param TsidiiReader reader: TsidiiReader Instance the body is for
+            :return tuple: The parsed message as well as flag indicating private message
+        '''
+        if len(parts) == 1:
+            return (parts[0], False)
+        return (self.private_prefix(reader).join(parts), True)
+
+    def iter_fill(self, segments, reader):
+        '''
+            Inserts the private note prefix of a reader into a body that is
+            resolved piece by piece
+
+            :param iterable segments: Segments returned by CompiledBody.iter_resolve
+            :param TsidiiReader reader: TsidiiReader Instance the body is for
+            :return generator: The parsed message in pieces
+        '''
+        prefix = None
+        for segment in segments:
+            if segment is None:
+                if prefix is None:
+                    prefix = self.private_prefix(reader)
+                segment = prefix
+            if segment:
+                yield segment
+
+    def note_actions(self, compiled, reader):
+        '''
+            Decides what happens to every note of a compiled body for a reader
+
+            :param CompiledBody compiled: Body returned by compile
+            :param TsidiiReader reader: TsidiiReader Instance to check notes against
+            :return tuple: An action per note, in document order
+        '''
+        actions = []
+        for note in compiled.notes:
+            if note.parent is not None and actions[note.parent] == DECOMPOSE:
+                # Notes inside of a removed note are removed with it
+                actions.append(DECOMPOSE)
+            else:
+                actions.append(self._note_action(note, reader))
+        return tuple(actions)
+
+    def audience_index(self, compiled, bits=None):
+        '''
+            Creates the index used to decide note actions for many readers
+            at once, see AudienceIndex.actions
+
+            :param CompiledBody compiled: Body returned by compile
+            :param dict bits: Bit of every name, shared with other indexes [optional]
+            :return AudienceIndex: Index over the notes of the body
+        '''
+        return AudienceIndex(compiled, bits=bits)
+
+    def private_prefix(self, reader):
+        return html.escape(
+            " {} - ".format(reader.first_name.title()), quote=False
+        )
+
+    def _note_action(self, note, reader):
+        if not note.attrs:
+            return DECOMPOSE
+        if note.has_hidden and not self._user_flag_in_tag(reader, note.hidden):
+            # Unwrap tag if user flag is not in in hidden attributes
+            return UNWRAP
+        elif self._user_flag_in_tag(reader, note.private):
+            # Append Name then unwrap tag
+            return PRIVATE
+        elif self._user_flag_in_tag(reader, note.message):
+            # Unwrap tag if user is flagged in the tag
+            return UNWRAP
+        return DECOMPOSE
+
+    def _create_note(self, index, attrs, parent):
+        return NoteSegment(
+            index=index,
+            attrs=attrs,
+            message=audience_tokens(attrs.get(self.message_tag)),
+            hidden=audience_tokens(attrs.get(self.hidden_tag)),
+            private=audience_tokens(attrs.get(self.private_tag)),
+            has_hidden=bool(attrs.get(self.hidden_tag)),
+            parent=parent
+        )
+
+    def _user_flag_in_tag(self, reader, audience):
+        if not audience:
             return False
-        if reader.identifier in tag_attrs:
+        if reader.identifier in audience:
             return True
-        return any((group in tag_attrs for group in reader.groups))
+        return not audience.isdisjoint(reader.groups or ())
+
+
+class HTMLParser(BaseParser):
+    '''
+        Parser that reads the body with BeautifulSoup. The output is the
+        body as serialized by BeautifulSoup.
+    '''
+
+    def compile_body(self, body):
+        # Imported here so that using other parsers doesn't load bs4
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(body)
+        marker = self._create_marker(body)
+        notes = []
+        for tag in soup.find_all(self.note_tag):
+            notes.append(dict(tag.attrs))
+            # Replace the tag with markers that survive serialization
+            tag.insert_before("{0}o{1}{0}".format(marker, len(notes) - 1))
+            tag.insert_after("{0}c{0}".format(marker))
+            tag.unwrap()
+        return self._build_body(str(soup), marker, notes)
+
+    def _create_marker(self, body):
+        marker = "tsidii{}".format(uuid.uuid4().hex)
+        while marker in body:
+            marker = "tsidii{}".format(uuid.uuid4().hex)
+        return marker
+
+    def _build_body(self, text, marker, attrs):
+        notes = []
+        segments = []
+        stack = [segments]
+        parents = [None]
+        pattern = re.compile("{0}(o\\d+|c){0}".format(marker))
+        position = 0
+        for match in pattern.finditer(text):
+            if match.start() > position:
+                stack[-1].append(text[position:match.start()])
+            position = match.end()
+            token = match.group(1)
+            if token == "c":
+                stack.pop()
+                parents.pop()
+                continue
+            index = int(token[1:])
+            note = self._create_note(index, attrs[index], parents[-1])
+            notes.append(note)
+            stack[-1].append(note)
+            stack.append(note.children)
+            parents.append(index)
+        if position < len(text):
+            segments.append(text[position:])
+        return CompiledBody(segments, notes)
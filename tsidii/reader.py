@@ -1,7 +1,47 @@
+import os
 import re
+import csv
 import json
 import random
+import hashlib
 import logging
+from array import array
+from itertools import islice
+from collections import namedtuple
+
+_EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.\-]+@[a-zA-Z0-9_\-]+\.[a-zA-Z0-9_.\-]+$")
+
+# Allocated identifiers are 8 characters, each one made from a random byte
+_IDENTIFIER_LENGTH = 8
+_IDENTIFIER_TABLE = bytes(
+    b"abcdefghijklmnopqrstuvwxyz123456"[byte % 32] for byte in range(256)
+)
+
+
+RejectedReader = namedtuple("RejectedReader", ["position", "data", "reasons"])
+
+
+class ValidationReport(object):
+    '''
+        Result of ReaderCollection.import_readers
+
+        accepted - the readers that were added
+        rejected - RejectedReader tuples with the position of the row in the
+            input, the row itself and every reason it was rejected
+    '''
+
+    def __init__(self):
+        self.accepted = []
+        self.rejected = []
+
+    def as_dict(self):
+        return {
+            "accepted": len(self.accepted),
+            "rejected": [
+                {"position": rejected.position, "reasons": rejected.reasons}
+                for rejected in self.rejected
+            ]
+        }
 
 
 class ReaderCollection(object):
@@ -9,15 +49,85 @@ class ReaderCollection(object):
         Object that contains all information about the readers.
         Used when you want to parse a Tsidii Email on several readers
     '''
+    # Number of rows the from_ constructors add at once
+    load_batch_size = 10000
 
     def __init__(self):
         self.readers = []
         self.groups = set()
+        self._identifiers = {}
+        self._group_index = {}
 
     def __iter__(self):
         for reader in self.readers:
             yield reader
 
+    @classmethod
+    def from_jsonl(cls, fp, identifier_seed=None, identifiers_from_email=False,
+                   report=False):
+        '''
+            Creates a collection from a file with one JSON reader per line
+
+            :param file fp: File object of reader data as given by get_data
+            :param int identifier_seed: Seed for allocated identifiers [optional]
+            :param bool identifiers_from_email: Derive allocated identifiers from emails
+            :param bool report: Skip invalid readers and report them, see import_readers
+            :return ReaderCollection: The loaded collection, with a ValidationReport when reporting
+        '''
+        return cls()._load(
+            (json.loads(line) for line in fp if line.strip()),
+            identifier_seed, identifiers_from_email, report
+        )
+
+    @classmethod
+    def from_csv(cls, fp, identifier_seed=None, identifiers_from_email=False,
+                 report=False):
+        '''
+            Creates a collection from a CSV file with a header row. Columns
+            match the keys of get_data, groups are separated by spaces.
+
+            :param file fp: File object of reader data
+            :param int identifier_seed: Seed for allocated identifiers [optional]
+            :param bool identifiers_from_email: Derive allocated identifiers from emails
+            :param bool report: Skip invalid readers and report them, see import_readers
+            :return ReaderCollection: The loaded collection, with a ValidationReport when reporting
+        '''
+        return cls()._load(
+            (
+                {
+                    "firstName": row.get("firstName"),
+                    "lastName": row.get("lastName") or None,
+                    "email": row.get("email"),
+                    "identifier": row.get("identifier") or None,
+                    "groups": (row.get("groups") or "").split() or None
+                }
+                for row in csv.DictReader(fp)
+            ),
+            identifier_seed, identifiers_from_email, report
+        )
+
+    @classmethod
+    def from_json(cls, fp, chunk_size=65536, identifier_seed=None,
+                  identifiers_from_email=False, report=False):
+        '''
+            Creates a collection from a JSON document as written by dump.
+            The document is read incrementally, one reader at a time.
+
+            :param file fp: File object of the JSON document
+            :param int chunk_size: Number of characters read at once
+            :param int identifier_seed: Seed for allocated identifiers [optional]
+            :param bool identifiers_from_email: Derive allocated identifiers from emails
+            :param bool report: Skip invalid readers and report them, see import_readers
+            :return ReaderCollection: The loaded collection, with a ValidationReport when reporting
+        '''
+        return cls()._load(
+            _JSONReaderStream(fp, chunk_size), identifier_seed,
+            identifiers_from_email, report
+        )
+
+    def __len__(self):
+        return len(self.readers)
+
     def add_reader(self, email, first_name,  last_name=None, identifier=None,
                    groups=None, create_identifier=False):
         '''
@@ -28,6 +138,7 @@ class ReaderCollection(object):
             :param string last_name: Last Name of the Reader [optional]
             :param string identifier: Identifier to use for reader in parsing
             :param list<string> groups: Array of Group names
+            :return TsidiiReader: The reader that was added
         '''
         reader = TsidiiReader(
             first_name=first_name,
@@ -37,38 +148,536 @@ class ReaderCollection(object):
             groups=groups
         )
         self._verify_unique_identifier(reader)
+        self._store_reader(reader)
+        return reader
+
+    def add_readers(self, readers, identifier_seed=None, identifiers_from_email=False):
+        '''
+            Creates and adds several readers at once. Every reader is
+            validated before any of them is added, so a bad reader leaves
+            the collection untouched. Readers without an identifier get one
+            from allocate_identifiers.
+
+            :param iterable<dict> readers: Keyword arguments for add_reader
+            :param int identifier_seed: Seed for allocated identifiers [optional]
+            :param bool identifiers_from_email: Derive allocated identifiers from emails
+            :return list<TsidiiReader>: The readers that were added
+        '''
+        readers = self._with_identifiers(
+            list(readers), identifier_seed, identifiers_from_email
+        )
+        new_readers = []
+        identifiers = set()
+        for data in readers:
+            reader = TsidiiReader(
+                first_name=data["first_name"],
+                last_name=data.get("last_name"),
+                email=data["email"],
+                identifier=data.get("identifier"),
+                groups=data.get("groups")
+            )
+            self._verify_unique_identifier(reader)
+            # Readers earlier in the batch count as already added
+            if reader.identifier in identifiers:
+                raise ValueError(
+                    "'{}' not unique".format(reader.identifier)
+                )
+            for group in reader.groups or ():
+                if group in identifiers:
+                    raise ValueError(
+                        "Group conflicts with user identifier '{}'".format(group)
+                    )
+            identifiers.add(reader.identifier)
+            new_readers.append(reader)
+        for reader in new_readers:
+            self._store_reader(reader)
+        return new_readers
+
+    def import_readers(self, readers, identifier_seed=None,
+                       identifiers_from_email=False):
+        '''
+            Adds every valid reader and reports the invalid ones instead of
+            raising. All checks of a row are run so the report lists every
+            problem with it. Rows are checked in order, a row that reuses
+            the identifier of an earlier row is rejected.
+
+            :param iterable<dict> readers: Keyword arguments for add_reader
+            :param int identifier_seed: Seed for allocated identifiers [optional]
+            :param bool identifiers_from_email: Derive allocated identifiers from emails
+            :return ValidationReport: The accepted readers and rejected rows
+        '''
+        readers = list(readers)
+        row_errors = [_row_errors(data) for data in readers]
+        # Only rows that pass their own checks are given an identifier
+        valid = [position for position, reasons in enumerate(row_errors) if not reasons]
+        allocated = self._with_identifiers(
+            [readers[position] for position in valid], identifier_seed,
+            identifiers_from_email
+        )
+        for position, data in zip(valid, allocated):
+            readers[position] = data
+        report = ValidationReport()
+        for position, (data, reasons) in enumerate(zip(readers, row_errors)):
+            identifier = data.get("identifier")
+            groups = data.get("groups")
+            if not reasons:
+                reasons = self._conflicts(identifier, groups)
+            if reasons:
+                report.rejected.append(RejectedReader(position, data, reasons))
+                continue
+            reader = TsidiiReader.from_trusted(
+                first_name=data.get("first_name"),
+                last_name=data.get("last_name"),
+                email=data.get("email"),
+                identifier=identifier,
+                groups=groups
+            )
+            self._store_reader(reader)
+            report.accepted.append(reader)
+        return report
+
+    def allocate_identifiers(self, count=None, emails=None, seed=None,
+                             reserved=()):
+        '''
+            Creates identifiers in bulk that are unique and don't collide
+            with the identifiers and groups of the collection. Identifiers
+            are random, repeatable when a seed is given, or derived from a
+            hash of emails so the same email keeps the same identifier.
+
+            :param int count: Number of identifiers to create
+            :param list<string> emails: Create an identifier per email instead
+            :param int seed: Seed of the random identifiers [optional]
+            :param iterable<string> reserved: Other names to avoid
+            :return list<string>: The identifiers
+        '''
+        taken = set(reserved)
+        if emails is not None:
+            candidates = _encode_identifiers(
+                b"".join([_email_digest(email) for email in emails])
+            )
+            retry_keys = emails
+        else:
+            rng = random.Random(seed) if seed is not None else None
+            candidates = _encode_identifiers(_random_bytes(rng, count))
+        taken.update(self._names_in_use(candidates))
+        if len(set(candidates)) == len(candidates) and taken.isdisjoint(candidates):
+            return candidates
+        identifiers = []
+        for position, identifier in enumerate(candidates):
+            attempt = 0
+            while identifier in taken or (attempt and self._names_in_use([identifier])):
+                attempt += 1
+                if emails is not None:
+                    data = _email_digest("{}#{}".format(retry_keys[position], attempt))
+                else:
+                    data = _random_bytes(rng, 1)
+                identifier = _encode_identifiers(data)[0]
+            taken.add(identifier)
+            identifiers.append(identifier)
+        return identifiers
+
+    def get(self, identifier):
+        '''
+            Looks up a reader by identifier
+
+            :param string identifier: Identifier of the reader
+            :return TsidiiReader: The reader or None if there is no such reader
+        '''
+        return self._identifiers.get(identifier)
+
+    def readers_in_group(self, group):
+        '''
+            Returns the readers that belong to a group
+
+            :param string group: Name of the group
+            :return list<TsidiiReader>: Readers in the order they were added
+        '''
+        return list(self._group_index.get(group, ()))
+
+    def _with_identifiers(self, readers, seed, from_email):
+        missing = [
+            position for position, data in enumerate(readers)
+            if data.get("identifier") is None
+        ]
+        if not missing:
+            return readers
+        reserved = set()
+        for data in readers:
+            if isinstance(data.get("identifier"), str):
+                reserved.add(data["identifier"])
+            if isinstance(data.get("groups"), list):
+                reserved.update(data["groups"])
+        if from_email:
+            identifiers = self.allocate_identifiers(
+                emails=[readers[position]["email"] for position in missing],
+                reserved=reserved
+            )
+        else:
+            identifiers = self.allocate_identifiers(
+                len(missing), seed=seed, reserved=reserved
+            )
+        for position, identifier in zip(missing, identifiers):
+            readers[position] = dict(readers[position], identifier=identifier)
+        return readers
+
+    def _store_reader(self, reader):
         self.readers.append(reader)
+        self._identifiers[reader.identifier] = reader
         if reader.groups:
             self.groups.update(set(reader.groups))
+            for group in reader.groups:
+                self._group_index.setdefault(group, []).append(reader)
 
     def _verify_unique_identifier(self, new_reader):
-        # Recursive call seems excessive
-        for reader in self.readers:
-            if reader.identifier == new_reader.identifier:
-                raise ValueError(
-                    "'{}' not unique".format(new_reader.identifier)
-                )
-            elif new_reader.groups and reader.identifier in new_reader.groups:
-                raise ValueError(
-                    "Group conflicts with user identifier '{}'".format(reader.identifier)
-                )
+        reasons = self._conflicts(new_reader.identifier, new_reader.groups)
+        if reasons:
+            raise ValueError(reasons[0])
         return True
 
+    def _conflicts(self, identifier, groups):
+        reasons = []
+        if identifier in self._identifiers:
+            reasons.append("'{}' not unique".format(identifier))
+        for group in groups or ():
+            if group in self._identifiers:
+                reasons.append(
+                    "Group conflicts with user identifier '{}'".format(group)
+                )
+        return reasons
+
+    def _names_in_use(self, names):
+        # Names that are already an identifier or a group of the collection
+        names = set(names)
+        return names.intersection(self._identifiers) | names.intersection(self.groups)
+
     def as_json(self):
         '''
             Returns the collection as a JSON string
             :return string: Json blob of reader data
         '''
-        data = {
-            "readers": [reader.get_data() for reader in self.readers]
-        }
-        return json.dumps(data)
+        return "".join(self.iter_json())
+
+    def iter_json(self):
+        '''
+            Yields the collection as JSON, one reader at a time
+            :return generator: Chunks of the JSON blob of reader data
+        '''
+        yield '{"readers": ['
+        separator = ""
+        for reader in self:
+            yield separator + json.dumps(reader.get_data())
+            separator = ", "
+        yield "]}"
+
+    def dump(self, fp):
+        '''
+            Writes the collection as JSON to a file without building the
+            whole document in memory
+            :param file fp: Writable file object
+        '''
+        for chunk in self.iter_json():
+            fp.write(chunk)
+
+    def _load(self, rows, identifier_seed, identifiers_from_email, report):
+        if not report:
+            self._add_rows(rows, identifier_seed, identifiers_from_email)
+            return self
+        validation = ValidationReport()
+        self._add_rows(rows, identifier_seed, identifiers_from_email, validation)
+        return self, validation
+
+    def _add_rows(self, rows, identifier_seed=None, identifiers_from_email=False,
+                  report=None):
+        # Adds reader data as given by get_data with add_readers, a batch at
+        # a time, so identifiers are allocated in bulk without holding every
+        # row. With a ValidationReport, invalid rows are added to it instead.
+        rows = iter(rows)
+        offset = 0
+        while True:
+            batch = list(islice(rows, self.load_batch_size))
+            if not batch:
+                return
+            arguments = [_reader_arguments(data) for data in batch]
+            seed = None if identifier_seed is None else identifier_seed + offset
+            if report is None:
+                self.add_readers(arguments, seed, identifiers_from_email)
+            else:
+                result = self.import_readers(arguments, seed, identifiers_from_email)
+                report.accepted.extend(result.accepted)
+                report.rejected.extend(
+                    RejectedReader(offset + rejected.position, batch[rejected.position],
+                                   rejected.reasons)
+                    for rejected in result.rejected
+                )
+            offset += len(batch)
+
+
+def _reader_arguments(data):
+    # Keyword arguments of add_reader from reader data as given by get_data
+    return {
+        "first_name": data.get("firstName"),
+        "last_name": data.get("lastName"),
+        "email": data.get("email"),
+        "identifier": data.get("identifier"),
+        "groups": data.get("groups")
+    }
+
+
+def _row_errors(data):
+    # Same checks as TsidiiReader, but collecting every problem
+    reasons = []
+    email = data.get("email")
+    if not isinstance(email, str) or not _EMAIL_PATTERN.match(email):
+        reasons.append("Invalid Email")
+    identifier = data.get("identifier")
+    if not (identifier is None or isinstance(identifier, str)):
+        reasons.append("Identifier must be a String")
+    elif identifier is not None and " " in identifier:
+        reasons.append("Invalid identifier - '{}'".format(identifier))
+    for key, name in (("first_name", "first name"), ("last_name", "last name")):
+        value = data.get(key)
+        if value is not None and (not isinstance(value, str) or " " in value):
+            reasons.append("Invalid {} - '{}'".format(name, value))
+    groups = data.get("groups")
+    if groups is not None and (
+            not isinstance(groups, list) or
+            any(not isinstance(group, str) or " " in group for group in groups)):
+        reasons.append("Invalid list of groups")
+    return reasons
+
+
+def _random_bytes(rng, count):
+    size = count * _IDENTIFIER_LENGTH
+    if rng is None:
+        return os.urandom(size)
+    if not size:
+        return b""
+    return rng.getrandbits(size * 8).to_bytes(size, "big")
+
+
+def _email_digest(email):
+    return hashlib.blake2b(
+        email.lower().encode("utf-8"), digest_size=_IDENTIFIER_LENGTH
+    ).digest()
+
+
+def _encode_identifiers(data):
+    count = len(data) // _IDENTIFIER_LENGTH
+    step = _IDENTIFIER_LENGTH + 1
+    # Interleave separators so a single split creates every identifier
+    text = bytearray(b" " * (count * step))
+    letters = data.translate(_IDENTIFIER_TABLE)
+    for offset in range(_IDENTIFIER_LENGTH):
+        text[offset::step] = letters[offset::_IDENTIFIER_LENGTH]
+    return text.decode("ascii").split()
+
+
+class CompactReaderCollection(ReaderCollection):
+    '''
+        ReaderCollection that stores readers in columns instead of as
+        objects. Strings are kept back to back in byte buffers and groups
+        are stored as ids, readers are only created while iterating.
+        Use it for collections with millions of readers.
+    '''
+
+    def __init__(self):
+        self.groups = set()
+        self._identifiers = {}
+        self._group_ids = {}
+        self._group_names = []
+        self._group_index = {}
+        self._first_names = _StringColumn()
+        self._last_names = _StringColumn()
+        self._emails = _StringColumn()
+        self._identifier_column = _StringColumn()
+        self._reader_groups = array("I")
+        self._reader_group_ends = array("Q")
+
+    @property
+    def readers(self):
+        return _ReaderSequence(self)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._reader(index)
+
+    def __len__(self):
+        return len(self._emails)
+
+    def get(self, identifier):
+        index = self._identifiers.get(identifier)
+        if index is None:
+            return None
+        return self._reader(index)
+
+    def readers_in_group(self, group):
+        group_id = self._group_ids.get(group)
+        if group_id is None:
+            return []
+        return [self._reader(index) for index in self._group_index[group_id]]
+
+    def _store_reader(self, reader):
+        index = len(self)
+        self._first_names.append(reader.first_name)
+        self._last_names.append(reader.last_name)
+        self._emails.append(reader.email)
+        self._identifier_column.append(reader.identifier)
+        self._identifiers[reader.identifier] = index
+        for group in reader.groups or ():
+            group_id = self._group_ids.get(group)
+            if group_id is None:
+                group_id = self._group_ids[group] = len(self._group_names)
+                self._group_names.append(group)
+                self._group_index[group_id] = array("L")
+                self.groups.add(group)
+            self._reader_groups.append(group_id)
+            self._group_index[group_id].append(index)
+        self._reader_group_ends.append(len(self._reader_groups))
+
+    def _reader(self, index):
+        start = self._reader_group_ends[index - 1] if index else 0
+        groups = [
+            self._group_names[group_id]
+            for group_id in self._reader_groups[start:self._reader_group_ends[index]]
+        ]
+        return TsidiiReader.from_trusted(
+            first_name=self._first_names[index],
+            last_name=self._last_names[index],
+            email=self._emails[index],
+            identifier=self._identifier_column[index],
+            groups=groups or None
+        )
+
+
+class _ReaderSequence(object):
+    '''
+        Read only sequence of the readers of a collection that creates
+        readers on demand with _reader(index)
+    '''
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __len__(self):
+        return len(self.collection)
+
+    def __iter__(self):
+        return iter(self.collection)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.collection)
+        if not 0 <= index < len(self.collection):
+            raise IndexError("Reader index out of range")
+        return self.collection._reader(index)
+
+
+class _StringColumn(object):
+    '''
+        Strings (or None) stored back to back in a single byte buffer
+    '''
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array("Q")
+
+    def __len__(self):
+        return len(self.ends)
+
+    def append(self, value):
+        if value is None:
+            self.data.append(0)
+        else:
+            self.data.append(1)
+            self.data.extend(value.encode("utf-8"))
+        self.ends.append(len(self.data))
+
+    def __getitem__(self, index):
+        start = self.ends[index - 1] if index else 0
+        if not self.data[start]:
+            return None
+        return self.data[start + 1:self.ends[index]].decode("utf-8")
+
+
+class _JSONReaderStream(object):
+    '''
+        Iterates over the readers of a {"readers": [...]} JSON document
+        while only holding a chunk of the file in memory
+    '''
+
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.decoder = json.JSONDecoder()
+
+    def __iter__(self):
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "readers":
+                self._expect("[")
+                if self._peek() != "]":
+                    while True:
+                        yield self._value()
+                        if self._peek() != ",":
+                            break
+                        self.position += 1
+                self._expect("]")
+            else:
+                self._value()
+            if self._peek() != ",":
+                break
+            self.position += 1
+        self._expect("}")
+
+    def _fill(self):
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError("Expected '{}' in JSON document".format(char))
+        self.position += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # A value ending with the buffer may continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.position = end
+            return value
 
 
 class TsidiiReader(object):
     '''
         An object that stores data about a reader
     '''
+    __slots__ = ("first_name", "last_name", "email", "identifier", "groups")
 
     def __init__(self, first_name, last_name, email, identifier=None,
                  groups=None):
@@ -93,6 +702,19 @@ class TsidiiReader(object):
             raise TypeError("Invalid list of groups")
         self.groups = groups
 
+    @classmethod
+    def from_trusted(cls, first_name, last_name, email, identifier, groups):
+        '''
+            Creates a reader from data that has already been validated
+        '''
+        reader = cls.__new__(cls)
+        reader.first_name = first_name
+        reader.last_name = last_name
+        reader.email = email
+        reader.identifier = identifier
+        reader.groups = groups
+        return reader
+
     def _check_groups(self, groups):
         if not isinstance(groups, list):
             logging.error(
@@ -106,7 +728,7 @@ class TsidiiReader(object):
         return True
 
     def _check_email(self, email):
-        if not re.match(r"^[a-zA-Z0-9_.\-]+@[a-zA-Z0-9_\-]+\.[a-zA-Z0-9_.\-]+$", email):
+        if not _EMAIL_PATTERN.match(email):
             logging.error("{} is an invalid email address".format(email))
             return False
         return True
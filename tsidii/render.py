@@ -0,0 +1,45 @@
+from itertools import islice
+
+
+def iter_chunks(readers, chunk_size):
+    readers = iter(readers)
+    while True:
+        chunk = list(islice(readers, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def reader_parts(compiled, evaluate, readers, batch_size, classes, stats=None):
+    '''
+        Decides the note actions of readers a batch at a time and resolves
+        the parts of every audience class once. This is the loop shared by
+        every way of parsing emails, callers only differ in what they do
+        with the parts.
+
+        :param CompiledBody compiled: The compiled body
+        :param function evaluate: Called with a batch of readers, returns their note actions
+        :param iterable readers: Readers to resolve the parts for
+        :param int batch_size: Number of readers evaluated together
+        :param dict classes: Resolved parts by note actions, filled in as classes are found
+        :param RenderStats stats: Times evaluate and resolve, counts classes [optional]
+        :return generator: (reader, note actions, resolved parts) tuples
+    '''
+    for batch in iter_chunks(readers, batch_size):
+        if stats is None:
+            batch_actions = evaluate(batch)
+        else:
+            start = stats.clock()
+            batch_actions = evaluate(batch)
+            stats.add_time("evaluate", stats.clock() - start)
+        for reader, actions in zip(batch, batch_actions):
+            parts = classes.get(actions)
+            if parts is None:
+                if stats is None:
+                    parts = classes[actions] = compiled.resolve(actions)
+                else:
+                    start = stats.clock()
+                    parts = classes[actions] = compiled.resolve(actions)
+                    stats.add_time("serialize", stats.clock() - start)
+                    stats.count("classes")
+            yield reader, actions, parts
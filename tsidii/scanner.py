@@ -0,0 +1,139 @@
+import re
+import html
+
+from tsidii.parser import BaseParser
+from tsidii.template import CompiledBody
+
+_ATTRIBUTE = re.compile(
+    r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?'''
+)
+
+
+class NoteScanner(BaseParser):
+    '''
+        Parser that only understands note tags. Everything outside of note
+        tags, including comments and the contents of script and style
+        elements, is copied through untouched, and bodies without a note
+        tag are not scanned at all.
+    '''
+
+    def __init__(self, note_tag="note", cache=None):
+        super(NoteScanner, self).__init__(note_tag=note_tag, cache=cache)
+        tag = re.escape(note_tag)
+        self._note_start = re.compile(r"<{}(?=[\s/>])".format(tag), re.IGNORECASE)
+        self._tokens = re.compile(
+            r"<!--.*?-->"
+            r"|<(script|style)(?=[\s/>]).*?</\1\s*>"
+            r"|<({0})((?:\s+[^\s\"'>/=]+(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'>]+))?)*)\s*(/?)>"
+            r"|</{0}\s*>".format(tag),
+            re.IGNORECASE | re.DOTALL
+        )
+        # Start of every token with the characters that may follow it
+        self._starts = [
+            ("<!--", None),
+            ("<script", "/>"),
+            ("<style", "/>"),
+            ("<" + note_tag.lower(), "/>"),
+            ("</" + note_tag.lower(), ">")
+        ]
+        self._longest_start = max(len(opening) for opening, _ in self._starts)
+
+    def compile_body(self, body):
+        if not self._note_start.search(body):
+            return CompiledBody([body] if body else [], [])
+        return self.compile_stream([body])
+
+    def compile_stream(self, chunks):
+        '''
+            Compiles a body that is given in pieces, one piece at a time.
+            Text is kept in segments no longer than the pieces, only a tag,
+            comment or script that is cut by the end of a piece is held
+            until the next one. The compiled body is the same as the one of
+            the joined pieces.
+
+            :param iterable<string> chunks: The message in order
+            :return CompiledBody: The compiled message
+        '''
+        notes = []
+        segments = []
+        stack = [segments]
+        parents = [None]
+        buffer = ""
+        chunks = iter(chunks)
+        chunk = next(chunks, None)
+        while chunk is not None:
+            if not isinstance(chunk, str):
+                raise ValueError(
+                    "Body chunks must be strings, not a '{}'".format(type(chunk))
+                )
+            buffer += chunk
+            chunk = next(chunks, None)
+            last = chunk is None
+            position = 0
+            scan = 0
+            while True:
+                start = buffer.find("<", scan)
+                if start == -1:
+                    start = len(buffer)
+                    break
+                match = self._tokens.match(buffer, start)
+                if match is None:
+                    if not last and self._incomplete(buffer, start):
+                        break
+                    scan = start + 1
+                    continue
+                scan = match.end()
+                if match.group(1) or match.group(0).startswith("<!--"):
+                    continue
+                closing = match.group(2) is None
+                if closing and len(stack) == 1:
+                    # Close tag without an open note is copied through
+                    continue
+                if match.start() > position:
+                    stack[-1].append(buffer[position:match.start()])
+                position = match.end()
+                if closing:
+                    stack.pop()
+                    parents.pop()
+                    continue
+                note = self._create_note(
+                    len(notes), self._parse_attributes(match.group(3)), parents[-1]
+                )
+                notes.append(note)
+                stack[-1].append(note)
+                if not match.group(4):
+                    stack.append(note.children)
+                    parents.append(note.index)
+            if start > position:
+                stack[-1].append(buffer[position:start])
+            buffer = buffer[start:]
+        return CompiledBody(segments, notes)
+
+    def _incomplete(self, buffer, start):
+        # Whether more of the body could turn the text at start into a token
+        text = buffer[start:start + self._longest_start + 1].lower()
+        for opening, ends in self._starts:
+            if len(text) < len(opening):
+                if opening.startswith(text):
+                    return True
+            elif text.startswith(opening):
+                if ends is None or len(text) == len(opening):
+                    return True
+                following = text[len(opening)]
+                if following.isspace() or following in ends:
+                    return True
+        return False
+
+    def _parse_attributes(self, text):
+        attrs = {}
+        for match in _ATTRIBUTE.finditer(text):
+            name = match.group(1).lower()
+            if name in attrs:
+                continue
+            value = match.group(2)
+            if value is None:
+                value = match.group(3)
+            if value is None:
+                value = match.group(4)
+            attrs[name] = html.unescape(value) if value else ""
+        return attrs
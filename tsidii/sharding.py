@@ -0,0 +1,221 @@
+import json
+import hashlib
+
+from tsidii.reader import ReaderCollection, _JSONReaderStream
+
+
+def shard_for(key, num_shards):
+    '''
+        Picks the shard of a key. The shard only depends on the key and
+        the number of shards, so every process and host agrees on it.
+
+        :param string key: Identifier or email address of a reader
+        :param int num_shards: Number of shards
+        :return int: The shard, from 0 to num_shards - 1
+    '''
+    if num_shards < 1:
+        raise ValueError("Number of shards must be at least 1")
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+def reader_shard(data, num_shards):
+    '''
+        Picks the shard of a reader by its identifier, readers without an
+        identifier are placed by their email address
+
+        :param dict data: Reader data as given by get_data
+        :param int num_shards: Number of shards
+        :return int: The shard of the reader
+    '''
+    identifier = data.get("identifier")
+    if identifier:
+        return shard_for(identifier, num_shards)
+    return shard_for("email:" + data["email"].lower(), num_shards)
+
+
+def iter_records(fp, chunk_size=65536):
+    '''
+        Reads reader data from a JSON document as read by
+        ReaderCollection.from_json or from a file with one JSON reader per
+        line, one reader at a time
+
+        :param file fp: File object of reader data
+        :param int chunk_size: Number of characters read at once
+        :return generator: Reader data as given by get_data
+    '''
+    recorder = _Recorder(fp)
+    is_document = _is_document(recorder, chunk_size)
+    head = "".join(recorder.chunks)
+    if is_document:
+        for data in _JSONReaderStream(_Replay(head, fp), chunk_size):
+            yield data
+        return
+    buffer = head
+    while True:
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+def load_shard(fp, shard, num_shards, collection_class=ReaderCollection,
+               chunk_size=65536):
+    '''
+        Creates the collection of a single shard from the export of every
+        reader. Readers of other shards are skipped without being created,
+        readers without an identifier get one derived from their email.
+
+        :param file fp: File object of reader data, see iter_records
+        :param int shard: Shard to load, from 0 to num_shards - 1
+        :param int num_shards: Number of shards
+        :param class collection_class: ReaderCollection class to load into
+        :param int chunk_size: Number of characters read at once
+        :return ReaderCollection: The readers of the shard
+    '''
+    if not 0 <= shard < num_shards:
+        raise ValueError("Shard must be between 0 and {}".format(num_shards - 1))
+    collection = collection_class()
+    # Readers without an identifier are placed by email, so their
+    # identifier is derived from it as well and is the same on every run
+    collection._add_rows(
+        (
+            data for data in iter_records(fp, chunk_size)
+            if reader_shard(data, num_shards) == shard
+        ),
+        identifiers_from_email=True
+    )
+    return collection
+
+
+class ShardManifest(object):
+    '''
+        Describes a send that is split into shards, so that every worker
+        can check it renders the same body with the same parser and that
+        together the shards hold every reader
+    '''
+
+    def __init__(self, body_hash, counts, parser_config):
+        self.body_hash = body_hash
+        self.counts = list(counts)
+        self.parser_config = tuple(parser_config)
+
+    @property
+    def num_shards(self):
+        return len(self.counts)
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    @classmethod
+    def create(cls, body, parser, records, num_shards):
+        '''
+            :param string body: The message to be sent
+            :param BaseParser parser: Parser every worker uses
+            :param iterable<dict> records: Reader data, see iter_records
+            :param int num_shards: Number of shards
+            :return ShardManifest: The manifest of the send
+        '''
+        counts = [0] * num_shards
+        for data in records:
+            counts[reader_shard(data, num_shards)] += 1
+        return cls(body_hash(body), counts, parser.config())
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(data["bodyHash"], data["counts"], data["parserConfig"])
+
+    def as_json(self):
+        return json.dumps({
+            "bodyHash": self.body_hash,
+            "counts": self.counts,
+            "parserConfig": list(self.parser_config)
+        })
+
+    def verify(self, body, parser, shard=None, collection=None):
+        '''
+            Checks that a worker matches the manifest
+
+            :param string body: The message the worker is sending
+            :param BaseParser parser: Parser of the worker
+            :param int shard: Shard of the worker [optional]
+            :param ReaderCollection collection: Readers loaded for the shard [optional]
+        '''
+        if body_hash(body) != self.body_hash:
+            raise ValueError("Body does not match the manifest")
+        if tuple(parser.config()) != self.parser_config:
+            raise ValueError("Parser does not match the manifest")
+        if collection is not None and len(collection) != self.counts[shard]:
+            raise ValueError(
+                "Shard {} has {} readers, the manifest expects {}".format(
+                    shard, len(collection), self.counts[shard]
+                )
+            )
+
+
+def body_hash(body):
+    '''
+        :param string body: The message to be sent
+        :return string: SHA-256 of the message
+    '''
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _is_document(fp, chunk_size):
+    # A document is an object with a readers key or without an email key,
+    # any other object is the first reader of a file of lines. Only the
+    # keys of the first object are read, so a document is not read whole.
+    stream = _JSONReaderStream(fp, chunk_size)
+    keys = set()
+    try:
+        stream._expect("{")
+        while stream._peek() != "}":
+            key = stream._value()
+            if key == "readers":
+                return True
+            keys.add(key)
+            stream._expect(":")
+            stream._value()
+            if stream._peek() != ",":
+                break
+            stream.position += 1
+    except ValueError:
+        # Not an object, left to the line reader to report
+        return False
+    return "email" not in keys
+
+
+class _Recorder(object):
+    # File object that keeps everything read from fp
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.chunks = []
+
+    def read(self, size):
+        chunk = self.fp.read(size)
+        self.chunks.append(chunk)
+        return chunk
+
+
+class _Replay(object):
+    # File object that reads the text that was already read from fp first
+
+    def __init__(self, head, fp):
+        self.head = head
+        self.fp = fp
+
+    def read(self, size):
+        if self.head:
+            head, self.head = self.head, ""
+            return head
+        return self.fp.read(size)
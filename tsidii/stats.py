@@ -0,0 +1,76 @@
+import time
+
+from tsidii.template import DECOMPOSE, UNWRAP, PRIVATE
+
+STAGES = ("compile", "evaluate", "serialize", "consumer")
+COUNTERS = (
+    "readers", "classes", "notes", "decomposed", "unwrapped", "private",
+    "private_emails", "bytes_out"
+)
+
+
+class RenderStats(object):
+    '''
+        Timers and counters collected while parsing emails. Pass an
+        instance to TsidiiEmail.reader_emails or parse_reader_email to
+        collect them, the callback is called with every reader and a dict
+        of the counts for that reader.
+
+        Timers are in seconds:
+            compile - parsing the body
+            evaluate - deciding the note actions
+            serialize - joining the segments of the email
+            consumer - time spent by the code using reader_emails
+    '''
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.timers = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._action_counts = {}
+
+    def add_time(self, stage, seconds):
+        self.timers[stage] += seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def reader_done(self, reader, actions, message, private):
+        '''
+            Records the counts of a single parsed email
+
+            :param TsidiiReader reader: Reader the email was parsed for
+            :param tuple actions: The note actions of the reader
+            :param string message: The parsed email
+            :param bool private: Whether the email has a private note
+        '''
+        counts = self._action_counts.get(actions)
+        if counts is None:
+            counts = self._action_counts[actions] = {
+                "notes": len(actions),
+                "decomposed": actions.count(DECOMPOSE),
+                "unwrapped": actions.count(UNWRAP),
+                "private": actions.count(PRIVATE)
+            }
+        counters = self.counters
+        counters["readers"] += 1
+        for name, amount in counts.items():
+            counters[name] += amount
+        size = len(message.encode("utf-8"))
+        counters["bytes_out"] += size
+        if private:
+            counters["private_emails"] += 1
+        if self.callback is not None:
+            reader_counts = dict(counts, bytes_out=size)
+            self.callback(reader, reader_counts)
+
+    def as_dict(self):
+        '''
+            :return dict: The timers and counters, ready to export
+        '''
+        data = {"timers": dict(self.timers), "counters": dict(self.counters)}
+        readers = self.counters["readers"]
+        total = sum(self.timers[stage] for stage in STAGES if stage != "consumer")
+        data["emails_per_second"] = readers / total if total else None
+        return data
@@ -0,0 +1,211 @@
+import json
+import sqlite3
+import threading
+from itertools import islice
+
+from tsidii.reader import ReaderCollection, TsidiiReader, _ReaderSequence
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readers (
+    position INTEGER PRIMARY KEY,
+    identifier TEXT NOT NULL UNIQUE,
+    first_name TEXT,
+    last_name TEXT,
+    email TEXT NOT NULL,
+    groups TEXT
+);
+CREATE TABLE IF NOT EXISTS reader_groups (
+    group_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (group_name, position)
+) WITHOUT ROWID;
+"""
+_COLUMNS = "position, identifier, first_name, last_name, email, groups"
+# SQLite limits the number of parameters of a query
+_QUERY_BATCH = 500
+
+
+class SQLiteReaderCollection(ReaderCollection):
+    '''
+        ReaderCollection stored in a SQLite database on disk. Readers are
+        read back lazily, page_size at a time, and identifiers and groups
+        are checked through indexes, so memory use does not grow with the
+        number of readers. add_readers and import_readers commit their
+        batch, other changes are saved by commit or close. The connection
+        is shared by every thread behind a lock, so readers may be iterated
+        in an executor as areader_emails does.
+    '''
+
+    def __init__(self, path=":memory:", page_size=1000):
+        if page_size < 1:
+            raise ValueError("Page size must be at least 1")
+        self.path = path
+        self.page_size = page_size
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._groups = None
+
+    @property
+    def readers(self):
+        return _ReaderSequence(self)
+
+    @property
+    def groups(self):
+        # Loaded once, _store_reader keeps it up to date
+        if self._groups is None:
+            self._groups = set(
+                row[0] for row in
+                self._query("SELECT DISTINCT group_name FROM reader_groups")
+            )
+        return self._groups
+
+    def __iter__(self):
+        position = -1
+        while True:
+            rows = self._query(
+                "SELECT {} FROM readers WHERE position > ? ORDER BY position LIMIT ?".format(_COLUMNS),
+                (position, self.page_size)
+            )
+            if not rows:
+                return
+            position = rows[-1][0]
+            for row in rows:
+                yield self._row_reader(row)
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM readers")[0][0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_readers(self, readers, identifier_seed=None, identifiers_from_email=False):
+        result = super(SQLiteReaderCollection, self).add_readers(
+            readers, identifier_seed, identifiers_from_email
+        )
+        self.commit()
+        return result
+
+    def import_readers(self, readers, identifier_seed=None, identifiers_from_email=False):
+        result = super(SQLiteReaderCollection, self).import_readers(
+            readers, identifier_seed, identifiers_from_email
+        )
+        self.commit()
+        return result
+
+    def get(self, identifier):
+        rows = self._query(
+            "SELECT {} FROM readers WHERE identifier = ?".format(_COLUMNS), (identifier,)
+        )
+        if not rows:
+            return None
+        return self._row_reader(rows[0])
+
+    def readers_in_group(self, group):
+        rows = self._query(
+            "SELECT {} FROM readers WHERE position IN "
+            "(SELECT position FROM reader_groups WHERE group_name = ?) "
+            "ORDER BY position".format(_COLUMNS),
+            (group,)
+        )
+        return [self._row_reader(row) for row in rows]
+
+    def commit(self):
+        with self._lock:
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
+
+    def _reader(self, index):
+        rows = self._query(
+            # Positions start at 1 and readers are never removed
+            "SELECT {} FROM readers WHERE position = ?".format(_COLUMNS),
+            (index + 1,)
+        )
+        if not rows:
+            raise IndexError("Reader index out of range")
+        return self._row_reader(rows[0])
+
+    def _row_reader(self, row):
+        return TsidiiReader.from_trusted(
+            first_name=row[2],
+            last_name=row[3],
+            email=row[4],
+            identifier=row[1],
+            groups=json.loads(row[5]) if row[5] else None
+        )
+
+    def _store_reader(self, reader):
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO readers (identifier, first_name, last_name, email, groups) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    reader.identifier,
+                    reader.first_name,
+                    reader.last_name,
+                    reader.email,
+                    json.dumps(reader.groups) if reader.groups else None
+                )
+            )
+            if reader.groups:
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO reader_groups (group_name, position) VALUES (?, ?)",
+                    [(group, cursor.lastrowid) for group in reader.groups]
+                )
+        if reader.groups and self._groups is not None:
+            self._groups.update(reader.groups)
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def _conflicts(self, identifier, groups):
+        reasons = []
+        if self._existing_identifiers([identifier]):
+            reasons.append("'{}' not unique".format(identifier))
+        existing = self._existing_identifiers(groups or ())
+        for group in groups or ():
+            if group in existing:
+                reasons.append(
+                    "Group conflicts with user identifier '{}'".format(group)
+                )
+        return reasons
+
+    def _names_in_use(self, names):
+        names = iter(set(names))
+        in_use = set()
+        while True:
+            batch = list(islice(names, _QUERY_BATCH))
+            if not batch:
+                return in_use
+            placeholders = ", ".join("?" * len(batch))
+            in_use.update(self._existing_identifiers(batch))
+            in_use.update(
+                row[0] for row in self._query(
+                    "SELECT DISTINCT group_name FROM reader_groups "
+                    "WHERE group_name IN ({})".format(placeholders),
+                    batch
+                )
+            )
+
+    def _existing_identifiers(self, identifiers):
+        identifiers = list(identifiers)
+        found = set()
+        for start in range(0, len(identifiers), _QUERY_BATCH):
+            batch = identifiers[start:start + _QUERY_BATCH]
+            found.update(
+                row[0] for row in self._query(
+                    "SELECT identifier FROM readers WHERE identifier IN ({})".format(
+                        ", ".join("?" * len(batch))
+                    ),
+                    batch
+                )
+            )
+        return found
@@ -0,0 +1,84 @@
+from tsidii.render import iter_chunks
+from tsidii.parser import BaseParser
+from tsidii.reader import ReaderCollection
+from tsidii.scanner import NoteScanner
+from tsidii.template import PRIVATE
+
+
+def text_chunks(source, chunk_size=65536):
+    '''
+        Reads a body in pieces
+
+        :param source: A string, a file object opened in text mode or an iterable of strings
+        :param int chunk_size: Characters read from a file or string at a time
+        :return generator: The body in order
+    '''
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be at least 1")
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+    if hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            if not isinstance(chunk, str):
+                raise ValueError("Body file must be opened in text mode")
+            yield chunk
+    for chunk in source:
+        yield chunk
+
+
+class StreamingEmail(object):
+    '''
+        Email with a body that is read from a file or from an iterable of
+        strings instead of being held as one string. The body is compiled
+        piece by piece by NoteScanner.compile_stream and the email of every
+        reader is produced in pieces, so no reader's email is ever joined
+        into a single string.
+    '''
+    # Number of readers whose note actions are decided together
+    batch_size = 1024
+
+    def __init__(self, source, recipients, parser=None, chunk_size=65536):
+        if not isinstance(recipients, ReaderCollection):
+            raise ValueError("Recipients must be an instance of ReaderCollection")
+        self.recipients = recipients
+        if parser is None:
+            parser = NoteScanner()
+        elif not isinstance(parser, BaseParser):
+            raise ValueError("Parser must be an instance of BaseParser")
+        self.parser = parser
+        self.compiled = parser.compile_stream(text_chunks(source, chunk_size))
+
+    def reader_chunks(self):
+        '''
+            Yields every reader with their parsed email in pieces. The
+            pieces of a reader have to be used before moving on to the next
+            reader.
+
+            :return generator: (TsidiiReader, generator of strings, private flag) tuples
+        '''
+        index = self.parser.audience_index(self.compiled)
+        for readers in iter_chunks(self.recipients, self.batch_size):
+            for reader, actions in zip(readers, index.actions(readers)):
+                chunks = self.parser.iter_fill(
+                    self.compiled.iter_resolve(actions), reader
+                )
+                yield reader, chunks, PRIVATE in actions
+
+    def write_emails(self, open_output):
+        '''
+            Writes the parsed email of every reader to a stream. Streams are
+            not closed.
+
+            :param function open_output: Called with a reader, returns a writable text stream
+            :return generator: (TsidiiReader, stream, private flag) tuples
+        '''
+        for reader, chunks, private in self.reader_chunks():
+            output = open_output(reader)
+            for chunk in chunks:
+                output.write(chunk)
+            yield reader, output, private
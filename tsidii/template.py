@@ -0,0 +1,76 @@
+DECOMPOSE = 0
+UNWRAP = 1
+PRIVATE = 2
+
+
+class NoteSegment(object):
+    '''
+        A note tag inside of a compiled body. The audiences of the note are
+        extracted once at compile time, as sets of identifiers and groups,
+        so rendering never has to look at the HTML again.
+    '''
+
+    def __init__(self, index, attrs, message=frozenset(), hidden=frozenset(),
+                 private=frozenset(), has_hidden=False, parent=None):
+        self.index = index
+        self.attrs = attrs
+        self.message = message
+        self.hidden = hidden
+        self.private = private
+        self.has_hidden = has_hidden
+        self.parent = parent
+        self.children = []
+
+
+class CompiledBody(object):
+    '''
+        A body that has been parsed once into static text segments and
+        note segments. Readers are rendered by joining segments together.
+    '''
+
+    def __init__(self, segments, notes):
+        self.segments = segments
+        self.notes = notes
+
+    def resolve(self, actions):
+        '''
+            Joins the segments that are visible for a set of note actions
+
+            :param sequence actions: An action per note, in document order
+            :return list<string>: The rendered body split on every place a
+                private note prefix has to be inserted
+        '''
+        parts = []
+        current = []
+        for segment in self.iter_resolve(actions):
+            if segment is None:
+                parts.append("".join(current))
+                current = []
+            else:
+                current.append(segment)
+        parts.append("".join(current))
+        return parts
+
+    def iter_resolve(self, actions):
+        '''
+            Yields the segments that are visible for a set of note actions
+            without joining them
+
+            :param sequence actions: An action per note, in document order
+            :return generator: Text segments, None where a private note
+                prefix has to be inserted
+        '''
+        stack = [iter(self.segments)]
+        while stack:
+            for segment in stack[-1]:
+                if isinstance(segment, NoteSegment):
+                    action = actions[segment.index]
+                    if action == DECOMPOSE:
+                        continue
+                    if action == PRIVATE:
+                        yield None
+                    stack.append(iter(segment.children))
+                    break
+                yield segment
+            else:
+                stack.pop()
@@ -0,0 +1,94 @@
+import asyncio
+import multiprocessing
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.parser import HTMLParser
+from tsidii.reader import ReaderCollection
+
+
+class Reader20FailsParser(HTMLParser):
+
+    def fill(self, parts, reader):
+        if reader.identifier == "reader20":
+            raise ValueError("Reader 20 is not allowed")
+        return super(Reader20FailsParser, self).fill(parts, reader)
+
+
+class TestAsyncReaderEmails(TestCase):
+
+    def setUp(self):
+        self.recipients = ReaderCollection()
+        for index in range(30):
+            self.recipients.add_reader(
+                first_name="Reader",
+                email="reader{}@example.com".format(index),
+                identifier="reader{}".format(index),
+                groups=["odd"] if index % 2 else ["even"]
+            )
+        self.email = TsidiiEmail("Hi<note message='odd'> odd</note>", self.recipients)
+
+    def test_matches_reader_emails(self):
+        async def collect():
+            return [
+                (reader.identifier, result)
+                async for reader, result in self.email.areader_emails(batch_size=7, queue_size=1)
+            ]
+        self.assertEqual(
+            [(reader.identifier, result) for reader, result in self.email.reader_emails()],
+            asyncio.run(collect())
+        )
+
+    def test_errors_are_raised(self):
+        email = TsidiiEmail("Hi", self.recipients)
+        email.parser = None
+
+        async def collect():
+            return [item async for item in email.areader_emails()]
+        with self.assertRaises(AttributeError):
+            asyncio.run(collect())
+
+    def test_early_stop_closes_workers(self):
+        async def first():
+            emails = self.email.areader_emails(workers=2, chunk_size=2, batch_size=3)
+            item = await emails.__anext__()
+            await emails.aclose()
+            return item, multiprocessing.active_children()
+
+        (reader, _), children = asyncio.run(first())
+        self.assertEqual("reader0", reader.identifier)
+        self.assertEqual([], children)
+
+    def test_deliver_to_sink(self):
+        delivered = []
+        running = [0, 0]
+
+        async def sink(reader, result):
+            running[0] += 1
+            running[1] = max(running)
+            await asyncio.sleep(0.001)
+            running[0] -= 1
+            if reader.identifier == "reader3":
+                raise IOError("Mailbox full")
+            delivered.append((reader.identifier, result[0]))
+
+        result = asyncio.run(self.email.adeliver(sink, concurrency=4, batch_size=5))
+        self.assertEqual(29, result.delivered)
+        self.assertEqual(["reader3"], [reader.identifier for reader, _ in result.failures])
+        self.assertEqual(29, len(delivered))
+        self.assertIn(("reader1", "Hi odd"), delivered)
+        self.assertLessEqual(running[1], 4)
+
+    def test_deliver_waits_for_sink_on_error(self):
+        email = TsidiiEmail("Hi", self.recipients, Reader20FailsParser())
+        calls = [0, 0]
+
+        async def sink(reader, result):
+            calls[0] += 1
+            await asyncio.sleep(0.01)
+            calls[1] += 1
+
+        with self.assertRaises(ValueError):
+            asyncio.run(email.adeliver(sink, concurrency=4, batch_size=5))
+        self.assertGreater(calls[0], 0)
+        self.assertEqual(calls[0], calls[1])
@@ -0,0 +1,66 @@
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.reader import ReaderCollection
+
+
+class TestAudienceReport(TestCase):
+
+    def setUp(self):
+        self.recipients = ReaderCollection()
+        self.recipients.add_reader(
+            first_name="Mabel",
+            email="mabel@example.com",
+            identifier="mabel",
+            groups=["pinesfamily", "mysterytwins"]
+        )
+        self.recipients.add_reader(
+            first_name="Dipper",
+            email="dipper@example.com",
+            identifier="dippy",
+            groups=["pinesfamily", "mysterytwins"]
+        )
+        self.recipients.add_reader(
+            first_name="Stan",
+            email="stan@example.com",
+            identifier="stan",
+            groups=["pinesfamily", "mysteryshack"]
+        )
+        self.recipients.add_reader(
+            first_name="Soos",
+            email="soos@example.com",
+            identifier="soos",
+            groups=["mysteryshack"]
+        )
+
+    def test_report(self):
+        body = (
+            "<note message='pinesfamily'>Family<note private='dippy stan'>Psst</note></note>"
+            "<note hidden='mysterytwins'>No twins</note>"
+            "<note message='gideon mysteryshack'>Shack</note>"
+        )
+        report = TsidiiEmail(body, self.recipients).audience_report()
+        self.assertEqual(4, report.readers)
+        self.assertEqual([3, 2, 2, 2], [note.visible for note in report.notes])
+        self.assertEqual(["dippy", "stan"], report.notes[1].private_recipients)
+        self.assertEqual(["dippy", "mabel"], report.notes[2].hidden_from)
+        self.assertEqual(["dippy", "stan"], report.private_recipients)
+        self.assertEqual(["gideon"], report.notes[3].unknown)
+        self.assertEqual(
+            ["Note 3 names unknown identifier or group 'gideon'"], report.warnings
+        )
+        self.assertEqual(4, len(report.as_dict()["notes"]))
+
+    def test_matches_parsed_emails(self):
+        body = "<note message='mysteryshack'>Shack</note><note private='mabel'>Hi</note>"
+        email = TsidiiEmail(body, self.recipients)
+        report = email.audience_report()
+        results = list(email.reader_emails())
+        self.assertEqual(
+            report.notes[0].visible,
+            sum("Shack" in message for _, (message, _) in results)
+        )
+        self.assertEqual(
+            report.private_recipients,
+            sorted(reader.identifier for reader, (_, private) in results if private)
+        )
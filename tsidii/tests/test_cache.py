@@ -0,0 +1,60 @@
+import pickle
+from unittest import TestCase
+
+from tsidii.cache import TemplateCache, get_default_cache
+from tsidii.parser import HTMLParser
+from tsidii.scanner import NoteScanner
+
+
+class TestTemplateCache(TestCase):
+
+    def test_shared_between_parsers(self):
+        cache = TemplateCache()
+        body = "Hi <note message='mabel'>Mabel</note>"
+        compiled = HTMLParser(cache=cache).compile(body)
+        self.assertIs(compiled, HTMLParser(cache=cache).compile(body))
+        self.assertEqual({"hits": 1, "misses": 1, "entries": 1, "bytes": len(body)}, cache.stats())
+
+    def test_parser_config_is_part_of_the_key(self):
+        cache = TemplateCache()
+        body = "Hi <note message='mabel'>Mabel</note>"
+        HTMLParser(cache=cache).compile(body)
+        HTMLParser(note_tag="aside", cache=cache).compile(body)
+        NoteScanner(cache=cache).compile(body)
+        self.assertEqual(3, cache.misses)
+        self.assertEqual(3, len(cache))
+
+    def test_evicts_least_recently_used(self):
+        cache = TemplateCache(max_entries=2)
+        parser = HTMLParser(cache=cache)
+        parser.compile("one")
+        parser.compile("two")
+        parser.compile("one")
+        parser.compile("three")
+        self.assertEqual(2, len(cache))
+        parser.compile("one")
+        self.assertEqual(2, cache.hits)
+        parser.compile("two")
+        self.assertEqual(4, cache.misses)
+
+    def test_evicts_by_size(self):
+        cache = TemplateCache(max_bytes=10)
+        parser = HTMLParser(cache=cache)
+        parser.compile("123456")
+        parser.compile("abcdef")
+        self.assertEqual(1, len(cache))
+        self.assertEqual(6, cache.stats()["bytes"])
+        parser.compile("x" * 11)
+        self.assertEqual(1, len(cache))
+
+    def test_disabled_cache(self):
+        parser = HTMLParser(cache=False)
+        body = "Hi"
+        self.assertIsNot(parser.compile(body), parser.compile(body))
+
+    def test_default_cache(self):
+        self.assertIs(get_default_cache(), HTMLParser().cache)
+        parser = pickle.loads(pickle.dumps(HTMLParser()))
+        self.assertIs(get_default_cache(), parser.cache)
+        parser = pickle.loads(pickle.dumps(HTMLParser(cache=TemplateCache(max_entries=3))))
+        self.assertEqual(3, parser.cache.max_entries)
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from tsidii.campaign import TsidiiCampaign
+from tsidii.email import TsidiiEmail
+from tsidii.reader import ReaderCollection
+from tsidii.scanner import NoteScanner
+
+
+class TestTsidiiCampaign(TestCase):
+
+    def setUp(self):
+        self.readers = ReaderCollection()
+        for number in range(30):
+            self.readers.add_reader(
+                first_name="Reader",
+                email="reader{}@example.com".format(number),
+                identifier="reader{}".format(number),
+                groups=["group{}".format(number % 3), "club{}".format(number % 80)]
+            )
+        self.bodies = [
+            "<p>Hello<note message='group0'> group zero</note>"
+            "<note private='reader4 reader5'>secret</note></p>",
+            "<p>Hola<note hidden='group1'> todos menos</note>"
+            "<note message='reader7'>siete</note></p>",
+            "".join(
+                "<note message='club{0}'>{0}</note>".format(number)
+                for number in range(80)
+            ),
+            "No notes at all"
+        ]
+
+    def test_matches_single_emails(self):
+        campaign = TsidiiCampaign(self.bodies, self.readers)
+        campaign.batch_size = 7
+        results = list(campaign.reader_emails())
+        self.assertEqual(len(self.readers), len(results))
+        for number, body in enumerate(self.bodies):
+            email = TsidiiEmail(body, self.readers)
+            self.assertEqual(
+                [(reader.identifier, result) for reader, result in email.reader_emails()],
+                [(reader.identifier, result[number]) for reader, result in results]
+            )
+            self.assertEqual(email.class_count, campaign.class_counts[number])
+
+    def test_scanner_parser(self):
+        campaign = TsidiiCampaign(self.bodies[:2], self.readers, parser=NoteScanner())
+        reader, results = next(iter(campaign.reader_emails()))
+        self.assertEqual("reader0", reader.identifier)
+        self.assertEqual(
+            [("<p>Hello group zero</p>", False), ("<p>Hola todos menos</p>", False)],
+            results
+        )
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            TsidiiCampaign([], self.readers)
+        with self.assertRaises(ValueError):
+            TsidiiCampaign(["body", 618], self.readers)
+        with self.assertRaises(ValueError):
+            TsidiiCampaign(["body"], [])
+        with self.assertRaises(ValueError):
+            TsidiiCampaign(["body"], self.readers, parser=object())
@@ -0,0 +1,141 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+import tsidii
+from tsidii.checkpoint import ProgressJournal, resume
+from tsidii.email import TsidiiEmail
+from tsidii.reader import ReaderCollection
+
+# Sends an email to every reader of a collection, appending one line per
+# reader to an output file, and stops abruptly after CRASH_AT readers
+SEND = """
+import os, sys
+from tsidii.checkpoint import ProgressJournal, resume
+from tsidii.email import TsidiiEmail
+from tsidii.reader import ReaderCollection
+from tsidii.scanner import NoteScanner
+
+journal_path, output_path, crash_at = sys.argv[1], sys.argv[2], int(sys.argv[3])
+readers = ReaderCollection()
+for number in range(500):
+    readers.add_reader(
+        first_name="Reader",
+        email="reader{}@example.com".format(number),
+        identifier="reader{}".format(number),
+        groups=["group{}".format(number % 3)]
+    )
+# Unbuffered, so lines of the batch that is cut short reach the file
+output = open(output_path, "a+b", buffering=0)
+
+def before_flush():
+    os.fsync(output.fileno())
+    return output.tell()
+
+journal = ProgressJournal(journal_path, batch_size=32, before_flush=before_flush)
+output.truncate(int(journal.mark or 0))
+email = TsidiiEmail("Hi<note message='group1'> one</note>", readers, NoteScanner())
+for count, (reader, (message, _)) in enumerate(resume(email, journal)):
+    if count == crash_at:
+        os._exit(3)
+    output.write("{} {}\\n".format(reader.identifier, message).encode("utf-8"))
+journal.close()
+output.close()
+"""
+
+
+class TestProgressJournal(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "progress.journal")
+
+    def test_batches_and_marks(self):
+        marks = iter(range(1, 10))
+        with ProgressJournal(self.path, batch_size=2, before_flush=lambda: next(marks)) as journal:
+            for identifier in ("stan", "ford", "soos"):
+                journal.record(identifier)
+            self.assertIn("soos", journal)
+            self.assertEqual("1", str(journal.mark))
+        journal = ProgressJournal(self.path)
+        self.assertEqual({"stan", "ford", "soos"}, journal.completed)
+        self.assertEqual("2", journal.mark)
+        journal.close()
+        with self.assertRaises(ValueError):
+            ProgressJournal(self.path, batch_size=0)
+
+    def test_drops_uncommitted_batch(self):
+        with open(self.path, "wb") as fp:
+            fp.write(b"+stan\n+ford\n=10\n+soos\n+mab")
+        with ProgressJournal(self.path) as journal:
+            self.assertEqual({"stan", "ford"}, journal.completed)
+            self.assertEqual("10", journal.mark)
+            journal.record("soos")
+        with open(self.path, "rb") as fp:
+            self.assertEqual(b"+stan\n+ford\n=10\n+soos\n=\n", fp.read())
+        with open(self.path, "wb") as fp:
+            fp.write(b"not a journal\n")
+        with self.assertRaises(ValueError):
+            ProgressJournal(self.path)
+
+    def test_resume_skips_done_readers(self):
+        readers = ReaderCollection()
+        for name in ("stan", "ford", "soos"):
+            readers.add_reader(first_name=name, email="{}@example.com".format(name),
+                               identifier=name)
+        email = TsidiiEmail("Hi", readers)
+        with ProgressJournal(self.path) as journal:
+            journal.record("ford")
+            self.assertEqual(
+                ["stan", "soos"],
+                [reader.identifier for reader, _ in resume(email, journal)]
+            )
+            self.assertEqual({"stan", "ford", "soos"}, journal.completed)
+
+    def test_resume_passes_options(self):
+        readers = ReaderCollection()
+        for name in ("stan", "ford", "soos"):
+            readers.add_reader(first_name=name, email="{}@example.com".format(name),
+                               identifier=name, groups=["pines"])
+        email = TsidiiEmail("Hi<note message='pines'> family</note>", readers)
+        with ProgressJournal(self.path) as journal:
+            journal.record("stan")
+            self.assertEqual(
+                [("ford", ("Hi family", False)), ("soos", ("Hi family", False))],
+                [(reader.identifier, result)
+                 for reader, result in resume(email, journal, workers=2, chunk_size=1)]
+            )
+        self.assertEqual(1, email.class_count)
+        self.assertEqual(3, email.audience_report().notes[0].visible)
+
+    def test_crash_and_resume_sends_every_reader_once(self):
+        output = os.path.join(self.directory, "sent.txt")
+        environment = dict(os.environ)
+        environment["PYTHONPATH"] = os.path.dirname(os.path.dirname(tsidii.__file__))
+
+        def send(crash_at):
+            return subprocess.call(
+                [sys.executable, "-c", SEND, self.path, output, str(crash_at)],
+                env=environment
+            )
+
+        self.assertEqual(3, send(150))
+        with ProgressJournal(self.path) as journal:
+            done = len(journal)
+        self.assertTrue(0 < done <= 150)
+        self.assertEqual(3, send(200))
+        self.assertEqual(0, send(-1))
+        with open(output) as fp:
+            lines = fp.read().splitlines()
+        identifiers = [line.split()[0] for line in lines]
+        self.assertEqual(500, len(identifiers))
+        self.assertEqual(
+            sorted("reader{}".format(number) for number in range(500)),
+            sorted(identifiers)
+        )
+        self.assertIn("reader1 Hi one", lines)
+        self.assertIn("reader0 Hi", lines)
@@ -0,0 +1,114 @@
+import json
+import mailbox
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from tsidii.cli import main, file_name
+
+
+class TestRender(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.body = self._write(
+            "body.html",
+            "<p>Hi<note message='mysterytwins'> twins</note>"
+            "<note private='stan'>From the shack</note></p>"
+        )
+        self.readers = self._write("readers.jsonl", "\n".join(json.dumps(reader) for reader in [
+            {"firstName": "Mabel", "email": "mabel@example.com", "identifier": "mabel",
+             "groups": ["mysterytwins"]},
+            {"firstName": "Stan", "email": "stan@example.com", "identifier": "stan"}
+        ]))
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as fp:
+            fp.write(text)
+        return path
+
+    def _render(self, *options):
+        stderr = StringIO()
+        with patch("sys.stderr", stderr):
+            code = main(["render", "--body", self.body, "--readers", self.readers] + list(options))
+        return code, stderr.getvalue()
+
+    def test_jsonl_output(self):
+        output = os.path.join(self.directory, "emails.jsonl")
+        code, stderr = self._render("--output", output, "--parser", "scanner")
+        self.assertEqual(0, code)
+        self.assertIn("Rendered 2 emails", stderr)
+        with open(output, encoding="utf-8") as fp:
+            lines = [json.loads(line) for line in fp]
+        self.assertEqual(
+            [
+                {"identifier": "mabel", "email": "mabel@example.com", "private": False,
+                 "body": "<p>Hi twins</p>"},
+                {"identifier": "stan", "email": "stan@example.com", "private": True,
+                 "body": "<p>Hi Stan - From the shack</p>"}
+            ],
+            lines
+        )
+
+    def test_directory_output(self):
+        output = os.path.join(self.directory, "emails")
+        code, stderr = self._render("--output", output, "--quiet", "--workers", "2")
+        self.assertEqual((0, ""), (code, stderr))
+        self.assertEqual(["mabel.html", "stan.html"], sorted(os.listdir(output)))
+        with open(os.path.join(output, "mabel.html"), encoding="utf-8") as fp:
+            self.assertEqual("<p>Hi twins</p>", fp.read())
+
+    def test_mbox_output(self):
+        output = os.path.join(self.directory, "emails.mbox")
+        code, _ = self._render("--output", output)
+        self.assertEqual(1, code)
+        code, _ = self._render(
+            "--output", output, "--from", "Stan <stan@example.com>", "--subject", "Hi"
+        )
+        self.assertEqual(0, code)
+        messages = list(mailbox.mbox(output))
+        self.assertEqual(["mabel@example.com", "stan@example.com"], [m["To"] for m in messages])
+        self.assertIn(
+            "From the shack",
+            messages[1].get_payload()[1].get_payload(decode=True).decode("utf-8")
+        )
+
+    def test_shards(self):
+        identifiers = []
+        for shard in range(3):
+            output = os.path.join(self.directory, "shard{}.jsonl".format(shard))
+            code, _ = self._render("--output", output, "--shard", "{}/3".format(shard))
+            self.assertEqual(0, code)
+            with open(output, encoding="utf-8") as fp:
+                identifiers.extend(json.loads(line)["identifier"] for line in fp)
+        self.assertEqual(["mabel", "stan"], sorted(identifiers))
+        with self.assertRaises(SystemExit), patch("sys.stderr", StringIO()):
+            self._render("--shard", "3/3")
+
+    def test_errors(self):
+        self.readers = self._write("readers.txt", "")
+        code, stderr = self._render()
+        self.assertEqual(1, code)
+        self.assertIn("tsidii: error:", stderr)
+
+    def test_file_name(self):
+        self.assertEqual("stan.html", file_name("stan"))
+        self.assertEqual("%2E.%2Fstan.html", file_name("../stan"))
+
+    def test_startup_skips_heavy_imports(self):
+        loaded = subprocess.check_output([
+            sys.executable, "-c",
+            "import sys, tsidii.cli, tsidii.email, tsidii.scanner; "
+            "parser = tsidii.scanner.NoteScanner(); "
+            "parser.audience_index(parser.compile('<p>No notes</p>')); "
+            "print(' '.join(name for name in ('bs4', 'multiprocessing', 'numpy') "
+            "if name in sys.modules))"
+        ]).decode().strip()
+        self.assertEqual("", loaded)
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from tsidii.dedup import BodyStore
+from tsidii.email import TsidiiEmail
+from tsidii.reader import ReaderCollection
+
+
+class TestBodyStore(TestCase):
+
+    def test_stores_bodies_once(self):
+        store = BodyStore()
+        first = store.put("<p>Hi</p>")
+        self.assertEqual(first, store.put("<p>Hi</p>"))
+        second = store.put("<p>Pacífica</p>")
+        self.assertNotEqual(first, second)
+        self.assertEqual("<p>Pacífica</p>", store.get(second))
+        self.assertIsNone(store.get("missing"))
+        self.assertEqual(2, len(store))
+        self.assertEqual(
+            {"bodies": 2, "references": 3, "bytes": 25, "referenced_bytes": 34},
+            store.stats()
+        )
+        with self.assertRaises(ValueError):
+            store.put(618)
+
+    def test_dump_and_load(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        store = BodyStore()
+        refs = [store.put("<p>Hi</p>"), store.put("<p>Bye</p>")]
+        self.assertEqual(2, store.dump(directory))
+        self.assertEqual(0, store.dump(directory))
+        loaded = BodyStore.load(directory)
+        self.assertEqual(["<p>Hi</p>", "<p>Bye</p>"], [loaded.get(ref) for ref in refs])
+        with open(os.path.join(directory, refs[0] + ".html"), "w") as fp:
+            fp.write("changed")
+        with self.assertRaises(ValueError):
+            BodyStore.load(directory)
+
+
+class TestDeduplicatedEmails(TestCase):
+
+    def setUp(self):
+        self.readers = ReaderCollection()
+        for number in range(12):
+            self.readers.add_reader(
+                first_name=["Mabel", "Dipper", "Mabel"][number % 3],
+                email="reader{}@example.com".format(number),
+                identifier="reader{}".format(number),
+                groups=["group{}".format(number % 4)]
+            )
+        self.body = (
+            "<p>Hi<note message='group0 group1'> friend</note>"
+            "<note private='group2'>psst</note></p>"
+        )
+
+    def test_matches_reader_emails(self):
+        email = TsidiiEmail(self.body, self.readers)
+        expected = [
+            (reader.identifier, result) for reader, result in email.reader_emails()
+        ]
+        deduplicated = list(email.deduplicated_emails())
+        store = email.body_store
+        self.assertEqual(
+            expected,
+            [
+                (reader.identifier, (store.get(ref), private))
+                for reader, ref, private in deduplicated
+            ]
+        )
+        # Two audiences without a private note and two private prefixes
+        self.assertEqual(4, len(store))
+        self.assertEqual(12, store.stats()["references"])
+
+    def test_shared_store(self):
+        store = BodyStore()
+        list(TsidiiEmail(self.body, self.readers).deduplicated_emails(store))
+        list(TsidiiEmail(self.body, self.readers).deduplicated_emails(store))
+        self.assertEqual(4, len(store))
+        self.assertEqual(24, store.stats()["references"])
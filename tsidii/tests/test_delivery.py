@@ -0,0 +1,144 @@
+import smtplib
+import socketserver
+import threading
+from unittest import TestCase
+
+from tsidii.delivery import SMTPPool, deliver
+from tsidii.email import TsidiiEmail
+from tsidii.reader import ReaderCollection
+
+
+class FakeSMTP(object):
+    '''
+        Stand in for smtplib.SMTP that records messages in memory
+    '''
+    instances = []
+    fail_once = set()
+    refuse = set()
+
+    def __init__(self, host, port, timeout=None):
+        self.messages = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def send_message(self, message, from_addr, to_addrs):
+        if to_addrs[0] in FakeSMTP.refuse:
+            raise smtplib.SMTPRecipientsRefused({to_addrs[0]: (550, b"No such user")})
+        if to_addrs[0] in FakeSMTP.fail_once:
+            FakeSMTP.fail_once.discard(to_addrs[0])
+            raise smtplib.SMTPServerDisconnected("Connection lost")
+        self.messages.append(message)
+
+    def quit(self):
+        self.closed = True
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        self.wfile.write(b"220 localhost ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().upper()
+            if command.startswith(b"EHLO") or command.startswith(b"HELO"):
+                self.wfile.write(b"250 localhost\r\n")
+            elif command == b"DATA":
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                data = []
+                for data_line in iter(self.rfile.readline, b".\r\n"):
+                    data.append(data_line)
+                self.server.messages.append(b"".join(data))
+                self.wfile.write(b"250 OK\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        socketserver.ThreadingTCPServer.__init__(self, ("127.0.0.1", 0), _SMTPHandler)
+        self.messages = []
+
+
+class TestDelivery(TestCase):
+
+    def setUp(self):
+        FakeSMTP.instances = []
+        FakeSMTP.fail_once = set()
+        FakeSMTP.refuse = set()
+        self.recipients = ReaderCollection()
+        for index in range(10):
+            self.recipients.add_reader(
+                first_name="Reader",
+                email="reader{}@example.com".format(index),
+                identifier="reader{}".format(index),
+                groups=["odd"] if index % 2 else ["even"]
+            )
+        self.email = TsidiiEmail("Hi<note message='odd'> odd</note>", self.recipients)
+
+    def test_reuses_connections(self):
+        pool = SMTPPool(size=2, messages_per_connection=4, connection_factory=FakeSMTP)
+        with pool:
+            report = deliver(self.email, pool, "shack@example.com", "News", backoff=0)
+        self.assertEqual(10, len(report.sent))
+        self.assertEqual({}, report.failures)
+        self.assertEqual(10, sum(len(smtp.messages) for smtp in FakeSMTP.instances))
+        self.assertTrue(all(len(smtp.messages) <= 4 for smtp in FakeSMTP.instances))
+        self.assertLessEqual(len(FakeSMTP.instances), 4)
+        self.assertTrue(all(smtp.closed for smtp in FakeSMTP.instances))
+        message = next(
+            message for smtp in FakeSMTP.instances for message in smtp.messages
+            if message["To"] == "reader1@example.com"
+        )
+        self.assertEqual("News", message["Subject"])
+        self.assertIn("Hi odd", message.get_content())
+
+    def test_retries_and_reports_failures(self):
+        FakeSMTP.fail_once.add("reader2@example.com")
+        FakeSMTP.refuse.add("reader5@example.com")
+        waits = []
+        pool = SMTPPool(size=1, connection_factory=FakeSMTP)
+        report = deliver(
+            self.email, pool, "shack@example.com", "News",
+            backoff=0.25, sleep=waits.append
+        )
+        pool.close()
+        self.assertEqual(9, len(report.sent))
+        self.assertEqual(["reader5"], list(report.failures))
+        self.assertIsInstance(report.failures["reader5"], smtplib.SMTPRecipientsRefused)
+        self.assertEqual([0.25], waits)
+        self.assertEqual(2, pool.opened)
+
+    def test_gives_up_after_retries(self):
+        class AlwaysDisconnected(FakeSMTP):
+            def send_message(self, message, from_addr, to_addrs):
+                raise smtplib.SMTPServerDisconnected("Connection lost")
+        pool = SMTPPool(size=1, connection_factory=AlwaysDisconnected)
+        report = deliver(self.email, pool, "shack@example.com", "News",
+                         retries=2, sleep=lambda seconds: None)
+        self.assertEqual([], report.sent)
+        self.assertEqual(10, len(report.failures))
+        self.assertEqual(30, pool.opened)
+
+    def test_local_smtp_server(self):
+        server = LocalSMTPServer()
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            with SMTPPool("127.0.0.1", server.server_address[1], size=2, timeout=5) as pool:
+                report = deliver(self.email, pool, "shack@example.com", "News")
+            self.assertEqual(10, len(report.sent))
+            self.assertLessEqual(pool.opened, 2)
+            self.assertEqual(10, len(server.messages))
+            self.assertTrue(any(b"To: reader3@example.com" in message for message in server.messages))
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -1,10 +1,13 @@
 from unittest import TestCase
 
 from tsidii.email import TsidiiEmail
+from tsidii.parser import HTMLParser
 from tsidii.reader import ReaderCollection
+from tsidii.scanner import NoteScanner
 
 
 class TestTsidiiEmail(TestCase):
+    parser_class = HTMLParser
 
     def test_invalid_body_type(self):
         body = 618
@@ -73,6 +76,12 @@ class TestTsidiiEmail(TestCase):
         with self.assertRaises(ValueError):
             TsidiiEmail(body, recipients, groups)
 
+    def test_invalid_parser(self):
+        body = "Just a test body"
+        recipients = ReaderCollection()
+        with self.assertRaises(ValueError):
+            TsidiiEmail(body, recipients, {"note_tag": "note"})
+
     def test_parsing_of_basic_body(self):
         body = "Just a test body"
         recipients = ReaderCollection()
@@ -92,7 +101,7 @@ class TestTsidiiEmail(TestCase):
             groups=["pinesfamily", "mysterytwins"]
 
         )
-        for reader, email in TsidiiEmail(body, recipients).reader_emails():
+        for reader, email in TsidiiEmail(body, recipients, self.parser_class()).reader_emails():
             self.assertEqual(body, email[0])
 
     def test_parsing_of_body_with_message(self):
@@ -114,7 +123,7 @@ class TestTsidiiEmail(TestCase):
             groups=["pinesfamily", "mysterytwins"]
 
         )
-        for reader, email in TsidiiEmail(body, recipients).reader_emails():
+        for reader, email in TsidiiEmail(body, recipients, self.parser_class()).reader_emails():
             if reader.first_name == "Dipper":
                 self.assertEqual("Just a test body\n", email[0])
             else:
@@ -139,7 +148,7 @@ class TestTsidiiEmail(TestCase):
             groups=["pinesfamily", "mysterytwins"]
 
         )
-        for reader, email in TsidiiEmail(body, recipients).reader_emails():
+        for reader, email in TsidiiEmail(body, recipients, self.parser_class()).reader_emails():
             if reader.first_name == "Dipper":
                 self.assertFalse(email[1])
                 self.assertEqual("Just a test body\n", email[0])
@@ -166,7 +175,7 @@ class TestTsidiiEmail(TestCase):
             groups=["pinesfamily", "mysterytwins"]
 
         )
-        for reader, email in TsidiiEmail(body, recipients).reader_emails():
+        for reader, email in TsidiiEmail(body, recipients, self.parser_class()).reader_emails():
             if reader.first_name == "Dipper":
                 self.assertFalse(email[1])
                 self.assertEqual("Just a test body\n", email[0])
@@ -192,7 +201,7 @@ class TestTsidiiEmail(TestCase):
             groups=["pinesfamily", "mysterytwins"]
 
         )
-        for reader, email in TsidiiEmail(body, recipients).reader_emails():
+        for reader, email in TsidiiEmail(body, recipients, self.parser_class()).reader_emails():
             self.assertFalse(email[1])
             self.assertEqual("Just a test body\n", email[0])
 
@@ -215,7 +224,7 @@ class TestTsidiiEmail(TestCase):
             groups=["pinesfamily", "mysterytwins"]
 
         )
-        for reader, email in TsidiiEmail(body, recipients).reader_emails():
+        for reader, email in TsidiiEmail(body, recipients, self.parser_class()).reader_emails():
             self.assertFalse(email[1])
             self.assertEqual("Just a test body\nTwins can see this!", email[0])
 
@@ -238,6 +247,44 @@ class TestTsidiiEmail(TestCase):
             groups=["pinesfamily", "mysterytwins"]
 
         )
-        for reader, email in TsidiiEmail(body, recipients).reader_emails():
+        for reader, email in TsidiiEmail(body, recipients, self.parser_class()).reader_emails():
             self.assertFalse(email[1])
             self.assertEqual("Just a test body\n", email[0])
+
+    def test_readers_with_same_audience_share_a_class(self):
+        body = "Hi<note message='pinesfamily'> twins</note><note private='dippy'>!</note>"
+        recipients = ReaderCollection()
+        recipients.add_reader(
+            first_name="Mabel",
+            email="mabel@example.com",
+            identifier="mabel",
+            groups=["pinesfamily"]
+        )
+        recipients.add_reader(
+            first_name="Dipper",
+            email="dipper@example.com",
+            identifier="dippy",
+            groups=["pinesfamily"]
+        )
+        recipients.add_reader(
+            first_name="Ford",
+            email="ford@example.com",
+            identifier="ford",
+            groups=["pinesfamily"]
+        )
+        email = TsidiiEmail(body, recipients, self.parser_class())
+        results = list(email.reader_emails())
+        self.assertEqual(2, email.class_count)
+        self.assertEqual(
+            ["mabel", "dippy", "ford"],
+            [reader.identifier for reader, _ in results]
+        )
+        self.assertEqual(("Hi twins", False), results[0][1])
+        self.assertEqual(("Hi twins Dipper - !", True), results[1][1])
+        self.assertEqual(("Hi twins", False), results[2][1])
+        classes = email.audience_classes()
+        self.assertEqual([2, 1], [len(readers) for readers in classes.values()])
+
+
+class TestTsidiiEmailNoteScanner(TestTsidiiEmail):
+    parser_class = NoteScanner
@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.incremental import diff_bodies
+from tsidii.parser import HTMLParser
+from tsidii.reader import ReaderCollection
+
+BODY = (
+    "<p>Hello</p><note message='odd'>Odd <note private='reader3'>three</note></note>"
+    "<note hidden='odd'>Even</note>"
+)
+
+
+class TestIncrementalRerender(TestCase):
+
+    def setUp(self):
+        self.parser = HTMLParser()
+        self.recipients = ReaderCollection()
+        for index in range(6):
+            self.recipients.add_reader(
+                first_name="Reader",
+                email="reader{}@example.com".format(index),
+                identifier="reader{}".format(index),
+                groups=["odd"] if index % 2 else ["even"]
+            )
+
+    def _rerender(self, new_body):
+        email = TsidiiEmail(BODY, self.recipients)
+        previous = dict(
+            (reader.identifier, result) for reader, result in email.reader_emails()
+        )
+        results = list(email.rerender(new_body, previous))
+        expected = [result for _, result in TsidiiEmail(new_body, self.recipients).reader_emails()]
+        self.assertEqual(expected, [result for _, result, _ in results])
+        self.assertEqual(new_body, email.body)
+        return [reader.identifier for reader, _, changed in results if changed]
+
+    def test_diff_changed_note(self):
+        diff = diff_bodies(
+            self.parser.compile(BODY),
+            self.parser.compile(BODY.replace("three", "3"))
+        )
+        self.assertTrue(diff.compatible)
+        self.assertEqual(set([1]), diff.changed_notes)
+        self.assertEqual(set(), diff.audience_notes)
+
+    def test_only_readers_seeing_the_note_change(self):
+        self.assertEqual(["reader3"], self._rerender(BODY.replace("three", "3")))
+        self.assertEqual(
+            ["reader1", "reader3", "reader5"], self._rerender(BODY.replace("Odd", "Uneven"))
+        )
+        self.assertEqual(
+            ["reader0", "reader2", "reader4"], self._rerender(BODY.replace("Even", "Not odd"))
+        )
+
+    def test_audience_change(self):
+        self.assertEqual(
+            ["reader1", "reader3"],
+            self._rerender(BODY.replace("private='reader3'", "private='reader1'"))
+        )
+
+    def test_static_change_rerenders_everyone(self):
+        self.assertEqual(6, len(self._rerender(BODY.replace("Hello", "Howdy"))))
+        self.assertEqual(6, len(self._rerender(BODY + "<note message='even'>New</note>")))
+        self.assertFalse(diff_bodies(
+            self.parser.compile(BODY), self.parser.compile("<p>Hello</p>")
+        ).compatible)
+
+    def test_missing_previous_results_are_parsed(self):
+        email = TsidiiEmail(BODY, self.recipients)
+        results = list(email.rerender(BODY, {}))
+        self.assertTrue(all(changed for _, _, changed in results))
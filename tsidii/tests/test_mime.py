@@ -0,0 +1,73 @@
+from email import message_from_bytes, policy
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.mime import MessageBuilder, html_to_text
+from tsidii.reader import ReaderCollection
+
+
+class TestMessageBuilder(TestCase):
+
+    def setUp(self):
+        self.readers = ReaderCollection()
+        for number in range(6):
+            self.readers.add_reader(
+                first_name="Reader",
+                email="reader{}@example.com".format(number),
+                identifier="reader{}".format(number),
+                groups=["group{}".format(number % 2)]
+            )
+        self.email = TsidiiEmail(
+            "<p>Hi<note message='group0'> Pacífica</note></p>", self.readers
+        )
+
+    def test_html_to_text(self):
+        self.assertEqual(
+            "Hi & welcome\nto the shack\n\nOne\n\nTwo\n",
+            html_to_text(
+                "<html><head><style>p {}</style></head><body>"
+                "<p>Hi &amp;   welcome<br>to the <b>shack</b></p>"
+                "<ul><li>One</li><li>Two</li></ul><script>x()</script></body></html>"
+            )
+        )
+        self.assertEqual("", html_to_text("<p> </p>"))
+
+    def test_messages_share_parts(self):
+        builder = MessageBuilder(
+            "Stan <stan@example.com>", "Mystery Shack news",
+            headers={"Reply-To": "soos@example.com"}
+        )
+        messages = list(builder.messages(self.email))
+        self.assertEqual(6, len(messages))
+        self.assertEqual(2, builder.misses)
+        self.assertEqual(4, builder.hits)
+        reader, message = messages[0]
+        self.assertEqual("reader0@example.com", message["To"])
+        self.assertEqual("soos@example.com", message["Reply-To"])
+        self.assertEqual("multipart/alternative", message.get_content_type())
+        self.assertEqual("Hi Pacífica\n", message.get_body(("plain",)).get_content())
+        self.assertEqual(
+            "<p>Hi Pacífica</p>\n", message.get_body(("html",)).get_content()
+        )
+        self.assertIs(
+            messages[0][1].get_body(("html",)), messages[2][1].get_body(("html",))
+        )
+
+    def test_bytes_match_messages(self):
+        for text in (True, False):
+            builder = MessageBuilder("Pacífica <pacifica@example.com>", "Hi", text=text)
+            for (reader, message), (_, data) in zip(
+                    builder.messages(self.email), builder.messages(self.email, raw=True)):
+                self.assertEqual(message.as_bytes(policy=policy.SMTP), data)
+                parsed = message_from_bytes(data, policy=policy.SMTP)
+                self.assertEqual(reader.email, parsed["To"])
+                self.assertEqual("Pacífica <pacifica@example.com>", parsed["From"])
+
+    def test_cache_is_bounded(self):
+        builder = MessageBuilder("stan@example.com", "Hi", max_entries=1)
+        reader = self.readers.readers[0]
+        for body in ("<p>A</p>", "<p>B</p>", "<p>A</p>"):
+            builder.build_bytes(reader, (body, False))
+        self.assertEqual(3, builder.misses)
+        with self.assertRaises(ValueError):
+            MessageBuilder("stan@example.com", "Hi", max_entries=0)
@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.parallel import ReaderRenderError
+from tsidii.parser import HTMLParser
+from tsidii.reader import ReaderCollection
+
+
+class StanFailsParser(HTMLParser):
+
+    def fill(self, parts, reader):
+        if reader.identifier == "stan":
+            raise ValueError("Stan is not allowed")
+        return super(StanFailsParser, self).fill(parts, reader)
+
+
+class TestParallelReaderEmails(TestCase):
+
+    def setUp(self):
+        self.body = (
+            "Hello<note message='pinesfamily'> family</note>"
+            "<note private='reader7'>Secret</note>"
+        )
+        self.recipients = ReaderCollection()
+        for index in range(25):
+            self.recipients.add_reader(
+                first_name="Reader{}".format(index),
+                email="reader{}@example.com".format(index),
+                identifier="reader{}".format(index),
+                groups=["pinesfamily"] if index % 2 else ["mysteryshack"]
+            )
+
+    def test_ordered_matches_serial(self):
+        serial = [
+            (reader.identifier, result)
+            for reader, result in TsidiiEmail(self.body, self.recipients).reader_emails()
+        ]
+        email = TsidiiEmail(self.body, self.recipients)
+        parallel = [
+            (reader.identifier, result)
+            for reader, result in email.reader_emails(workers=2, chunk_size=3, max_in_flight=2)
+        ]
+        self.assertEqual(serial, parallel)
+        self.assertEqual(3, email.class_count)
+
+    def test_unordered_yields_every_reader(self):
+        email = TsidiiEmail(self.body, self.recipients)
+        serial = [(reader.identifier, result) for reader, result in email.reader_emails()]
+        parallel = [
+            (reader.identifier, result)
+            for reader, result in email.reader_emails(workers=2, chunk_size=4, ordered=False)
+        ]
+        self.assertEqual(sorted(serial), sorted(parallel))
+
+    def test_reader_error_includes_identifier(self):
+        self.recipients.add_reader(
+            first_name="Stan",
+            email="stan@example.com",
+            identifier="stan"
+        )
+        email = TsidiiEmail(self.body, self.recipients, StanFailsParser())
+        with self.assertRaises(ReaderRenderError) as context:
+            list(email.reader_emails(workers=2, chunk_size=5))
+        self.assertEqual("stan", context.exception.identifier)
+        self.assertIn("Stan is not allowed", str(context.exception))
+
+    def test_invalid_chunk_size(self):
+        email = TsidiiEmail(self.body, self.recipients)
+        with self.assertRaises(ValueError):
+            list(email.reader_emails(workers=2, chunk_size=0))
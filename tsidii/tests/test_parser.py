@@ -1,13 +1,15 @@
 from unittest import TestCase
 
 from tsidii.reader import ReaderCollection
-from tsidii.parser import HTMLParser
+from tsidii.parser import BaseParser, HTMLParser
+from tsidii.scanner import NoteScanner
 
 
 class TestHTMLParser(TestCase):
+    parser_class = HTMLParser
 
     def test_body_type(self):
-        parser = HTMLParser()
+        parser = self.parser_class()
         readers = ReaderCollection()
         readers.add_reader(
             first_name="Dipper",
@@ -21,7 +23,101 @@ class TestHTMLParser(TestCase):
             parser.parse_reader_email(["invalid", "body"], readers.readers[0])
 
     def test_reader_type(self):
-        parser = HTMLParser()
+        parser = self.parser_class()
 
         with self.assertRaises(ValueError):
             parser.parse_reader_email("Valid email body", ["invalid", "reader", "obj"])
+
+    def test_compile_extracts_notes(self):
+        parser = self.parser_class()
+        compiled = parser.compile(
+            "Intro <note message='mabel'>Hi <note private='dippy'>Psst</note></note>"
+        )
+        self.assertEqual(2, len(compiled.notes))
+        self.assertEqual(frozenset(["mabel"]), compiled.notes[0].message)
+        self.assertEqual(frozenset(["dippy"]), compiled.notes[1].private)
+        self.assertEqual(0, compiled.notes[1].parent)
+
+    def test_compiled_render_matches_nested_notes(self):
+        parser = self.parser_class()
+        readers = ReaderCollection()
+        readers.add_reader(
+            first_name="Dipper",
+            last_name="Pines",
+            email="dipper@example.com",
+            identifier="dippy",
+            groups=["pinesfamily", "mysterytwins"]
+        )
+        readers.add_reader(
+            first_name="Stan",
+            last_name="Pines",
+            email="stan@example.com",
+            identifier="stan",
+            groups=["mysteryshack"]
+        )
+        compiled = parser.compile(
+            "<p>A &amp; B</p><note message='pinesfamily'>Family"
+            "<note private='dippy'>Psst</note></note><br/>"
+        )
+        dipper, stan = readers.readers
+        self.assertEqual(
+            ("<p>A &amp; B</p>Family Dipper - Psst<br/>", True),
+            parser.render(compiled, dipper)
+        )
+        self.assertEqual(
+            ("<p>A &amp; B</p><br/>", False),
+            parser.render(compiled, stan)
+        )
+
+    def test_private_prefix_is_escaped(self):
+        parser = self.parser_class()
+        readers = ReaderCollection()
+        readers.add_reader(
+            first_name="b&b",
+            email="bb@example.com",
+            identifier="bb"
+        )
+        self.assertEqual(
+            (" B&amp;B - Psst", True),
+            parser.parse_reader_email("<note private='bb'>Psst</note>", readers.readers[0])
+        )
+
+    def test_base_parser_is_abstract(self):
+        with self.assertRaises(TypeError):
+            BaseParser()
+
+
+class TestNoteScanner(TestHTMLParser):
+    parser_class = NoteScanner
+
+    def test_body_without_notes_is_not_parsed(self):
+        parser = self.parser_class()
+        body = "<p>Unclosed <b>markup &nbsp; stays</p>"
+        compiled = parser.compile(body)
+        self.assertEqual([body], compiled.segments)
+        self.assertEqual([], compiled.notes)
+
+    def test_copies_markup_untouched(self):
+        parser = self.parser_class()
+        readers = ReaderCollection()
+        readers.add_reader(
+            first_name="Soos",
+            email="soos@example.com",
+            identifier="soos",
+            groups=["shack"]
+        )
+        body = (
+            "<P CLASS=x>Hi<!-- <note message='soos'>no</note> --></p>"
+            "<NOTE Message=\"shack\" data-x='a>b'>Soos</NOTE><br>"
+            "<script>if (a<note) {}</script></note><note message='soos'/>"
+            "<notes>kept</notes><note private='soos'>Unclosed"
+        )
+        self.assertEqual(
+            (
+                "<P CLASS=x>Hi<!-- <note message='soos'>no</note> --></p>"
+                "Soos<br><script>if (a<note) {}</script></note>"
+                "<notes>kept</notes> Soos - Unclosed",
+                True
+            ),
+            parser.parse_reader_email(body, readers.readers[0])
+        )
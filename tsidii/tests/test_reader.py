@@ -1,6 +1,9 @@
+import json
+from io import StringIO
 from unittest import TestCase
+from unittest.mock import patch
 
-from tsidii.reader import ReaderCollection
+from tsidii.reader import ReaderCollection, CompactReaderCollection
 
 
 class TestReaderCollection(TestCase):
@@ -146,3 +149,371 @@ class TestReaderCollection(TestCase):
             identifier="buddy"
         )
         self.assertEqual(2, len(readers.readers))
+
+    def test_get_reader_by_identifier(self):
+        readers = ReaderCollection()
+        readers.add_reader(
+            first_name="Gideon",
+            email="tentoftelepathy@example.com",
+            identifier="gideon"
+        )
+        self.assertEqual("Gideon", readers.get("gideon").first_name)
+        self.assertIsNone(readers.get("bud"))
+
+    def test_readers_in_group(self):
+        readers = ReaderCollection()
+        readers.add_reader(
+            first_name="Gideon",
+            email="tentoftelepathy@example.com",
+            identifier="gideon",
+            groups=["gleefuls", "tent"]
+        )
+        readers.add_reader(
+            first_name="Bud",
+            email="usedcardeals@example.com",
+            identifier="bud",
+            groups=["gleefuls"]
+        )
+        self.assertEqual(
+            ["gideon", "bud"],
+            [reader.identifier for reader in readers.readers_in_group("gleefuls")]
+        )
+        self.assertEqual([], readers.readers_in_group("pines"))
+
+    def test_add_readers(self):
+        readers = ReaderCollection()
+        added = readers.add_readers([
+            {"first_name": "Gideon", "email": "tentoftelepathy@example.com", "identifier": "gideon"},
+            {"first_name": "Bud", "email": "usedcardeals@example.com", "groups": ["gleefuls"]}
+        ])
+        self.assertEqual(2, len(added))
+        self.assertEqual(2, len(readers))
+        self.assertEqual(set(["gleefuls"]), readers.groups)
+
+    def test_add_readers_is_all_or_nothing(self):
+        readers = ReaderCollection()
+        with self.assertRaises(ValueError):
+            readers.add_readers([
+                {"first_name": "Gideon", "email": "tentoftelepathy@example.com", "identifier": "gideon"},
+                {"first_name": "Bud", "email": "usedcardeals@example.com", "identifier": "gideon"}
+            ])
+        with self.assertRaises(ValueError):
+            readers.add_readers([
+                {"first_name": "Gideon", "email": "tentoftelepathy@example.com", "identifier": "gideon"},
+                {"first_name": "Bud", "email": "usedcardeals@example.com", "groups": ["gideon"]}
+            ])
+        self.assertEqual(0, len(readers))
+        self.assertIsNone(readers.get("gideon"))
+
+    def _gleefuls(self):
+        readers = ReaderCollection()
+        readers.add_reader(
+            first_name="Gideon",
+            last_name="Gleeful",
+            email="tentoftelepathy@example.com",
+            identifier="gideon",
+            groups=["gleefuls", "tent"]
+        )
+        readers.add_reader(
+            first_name="Bud",
+            email="usedcardeals@example.com",
+            identifier="bud"
+        )
+        return readers
+
+    def test_dump_matches_as_json(self):
+        readers = self._gleefuls()
+        output = StringIO()
+        readers.dump(output)
+        self.assertEqual(readers.as_json(), output.getvalue())
+        self.assertEqual(2, len(json.loads(output.getvalue())["readers"]))
+
+    def test_from_json_round_trip(self):
+        readers = self._gleefuls()
+        loaded = ReaderCollection.from_json(StringIO(readers.as_json()), chunk_size=7)
+        self.assertEqual(readers.as_json(), loaded.as_json())
+
+    def test_from_json_empty_and_extra_keys(self):
+        loaded = ReaderCollection.from_json(StringIO('{"version": 1.5, "readers": []}'))
+        self.assertEqual(0, len(loaded))
+        with self.assertRaises(ValueError):
+            ReaderCollection.from_json(StringIO('{"readers": [{"firstName": "Bud"'))
+
+    def test_from_jsonl(self):
+        readers = self._gleefuls()
+        lines = "\n".join(json.dumps(reader.get_data()) for reader in readers) + "\n"
+        loaded = ReaderCollection.from_jsonl(StringIO(lines))
+        self.assertEqual(readers.as_json(), loaded.as_json())
+
+    def test_from_csv(self):
+        data = (
+            "firstName,lastName,email,identifier,groups\n"
+            "Gideon,Gleeful,tentoftelepathy@example.com,gideon,gleefuls tent\n"
+            "Bud,,usedcardeals@example.com,bud,\n"
+        )
+        loaded = ReaderCollection.from_csv(StringIO(data))
+        self.assertEqual(self._gleefuls().as_json(), loaded.as_json())
+
+    def test_loaders_allocate_identifiers(self):
+        data = (
+            "firstName,email,groups\n"
+            "Stan,stan@example.com,shack\n"
+            "Ford,ford@example.com,\n"
+            "Soos,soos@example.com,shack\n"
+        )
+
+        class SmallBatches(ReaderCollection):
+            load_batch_size = 2
+
+        with patch("logging.info") as info:
+            first = SmallBatches.from_csv(StringIO(data), identifiers_from_email=True)
+            second = ReaderCollection.from_csv(StringIO(data), identifiers_from_email=True)
+            seeded = [
+                SmallBatches.from_csv(StringIO(data), identifier_seed=7) for _ in range(2)
+            ]
+        info.assert_not_called()
+        self.assertEqual(first.as_json(), second.as_json())
+        self.assertEqual(3, len(set(reader.identifier for reader in first)))
+        self.assertEqual(seeded[0].as_json(), seeded[1].as_json())
+        rows = "\n".join(
+            json.dumps(dict(reader.get_data(), identifier=None)) for reader in first
+        )
+        loaded = ReaderCollection.from_jsonl(StringIO(rows), identifiers_from_email=True)
+        self.assertEqual(first.as_json(), loaded.as_json())
+
+
+class TestCompactReaderCollection(TestCase):
+
+    def _readers(self, collection_class):
+        readers = collection_class()
+        readers.add_reader(
+            first_name="Gideon",
+            last_name="Gleeful",
+            email="tentoftelepathy@example.com",
+            identifier="gideon",
+            groups=["gleefuls", "tent"]
+        )
+        readers.add_reader(
+            first_name="Bud",
+            email="usedcardeals@example.com",
+            identifier="bud",
+            groups=["gleefuls"]
+        )
+        readers.add_reader(
+            first_name="Pacífica",
+            last_name="",
+            email="pacifica@example.com",
+            identifier="pacifica"
+        )
+        return readers
+
+    def test_matches_reader_collection(self):
+        readers = self._readers(ReaderCollection)
+        compact = self._readers(CompactReaderCollection)
+        self.assertEqual(readers.as_json(), compact.as_json())
+        self.assertEqual(
+            [reader.get_data() for reader in readers],
+            [reader.get_data() for reader in compact]
+        )
+        self.assertEqual(readers.groups, compact.groups)
+        self.assertEqual(3, len(compact.readers))
+        self.assertEqual("pacifica", compact.readers[-1].identifier)
+        self.assertEqual("", compact.readers[2].last_name)
+        self.assertIsNone(compact.readers[1].last_name)
+
+    def test_lookups(self):
+        compact = self._readers(CompactReaderCollection)
+        self.assertEqual("Bud", compact.get("bud").first_name)
+        self.assertIsNone(compact.get("stan"))
+        self.assertEqual(
+            ["gideon", "bud"],
+            [reader.identifier for reader in compact.readers_in_group("gleefuls")]
+        )
+        self.assertEqual([], compact.readers_in_group("pines"))
+
+    def test_keeps_error_semantics(self):
+        compact = self._readers(CompactReaderCollection)
+        with self.assertRaises(ValueError):
+            compact.add_reader(
+                first_name="Bud",
+                email="bud@example.com",
+                identifier="bud"
+            )
+        with self.assertRaises(ValueError):
+            compact.add_reader(
+                first_name="Stan",
+                email="stan@example.com",
+                identifier="stan",
+                groups=["gideon"]
+            )
+        self.assertEqual(3, len(compact))
+
+    def test_loads_from_json(self):
+        readers = self._readers(ReaderCollection)
+        compact = CompactReaderCollection.from_json(StringIO(readers.as_json()))
+        self.assertEqual(readers.as_json(), compact.as_json())
+
+
+class TestIdentifierAllocation(TestCase):
+
+    def test_seeded_identifiers_are_repeatable(self):
+        readers = ReaderCollection()
+        identifiers = readers.allocate_identifiers(100, seed=7)
+        self.assertEqual(identifiers, readers.allocate_identifiers(100, seed=7))
+        self.assertEqual(100, len(set(identifiers)))
+        self.assertTrue(all(len(identifier) == 8 and " " not in identifier for identifier in identifiers))
+
+    def test_identifiers_from_email_are_stable(self):
+        readers = ReaderCollection()
+        first = readers.allocate_identifiers(emails=["stan@example.com", "ford@example.com"])
+        second = readers.allocate_identifiers(emails=["ford@example.com"])
+        self.assertEqual(first[1], second[0])
+
+    def test_avoids_existing_identifiers_and_groups(self):
+        readers = ReaderCollection()
+        taken = readers.allocate_identifiers(3, seed=1)
+        readers.add_reader(
+            first_name="Stan",
+            email="stan@example.com",
+            identifier=taken[0],
+            groups=[taken[1]]
+        )
+        identifiers = readers.allocate_identifiers(3, seed=1, reserved=[taken[2]])
+        self.assertTrue(set(taken).isdisjoint(identifiers))
+        self.assertEqual(3, len(set(identifiers)))
+        email_identifier = readers.allocate_identifiers(emails=["soos@example.com"])[0]
+        readers.add_reader(
+            first_name="Soos",
+            email="soos@example.com",
+            identifier=email_identifier
+        )
+        self.assertNotEqual(
+            email_identifier, readers.allocate_identifiers(emails=["soos@example.com"])[0]
+        )
+
+    def test_add_readers_allocates_identifiers(self):
+        readers = ReaderCollection()
+        with patch("logging.info") as info:
+            added = readers.add_readers(
+                [
+                    {"first_name": "Stan", "email": "stan@example.com"},
+                    {"first_name": "Ford", "email": "ford@example.com", "identifier": "ford"},
+                    {"first_name": "Soos", "email": "soos@example.com"}
+                ],
+                identifiers_from_email=True
+            )
+        info.assert_not_called()
+        self.assertEqual("ford", added[1].identifier)
+        other = ReaderCollection()
+        other.add_readers(
+            [{"first_name": "Stan", "email": "stan@example.com"}],
+            identifiers_from_email=True
+        )
+        self.assertEqual(added[0].identifier, other.readers[0].identifier)
+        seeded = ReaderCollection()
+        seeded.add_readers([{"first_name": "Stan", "email": "stan@example.com"}], identifier_seed=3)
+        self.assertEqual(
+            ReaderCollection().allocate_identifiers(1, seed=3), [seeded.readers[0].identifier]
+        )
+
+
+class TestImportReaders(TestCase):
+
+    def test_collects_rejected_rows(self):
+        readers = ReaderCollection()
+        readers.add_reader(
+            first_name="Gideon",
+            email="tentoftelepathy@example.com",
+            identifier="gideon"
+        )
+        report = readers.import_readers([
+            {"first_name": "Bud", "email": "usedcardeals@example.com", "identifier": "bud"},
+            {"first_name": "Bud Jr", "email": "not an email", "identifier": "bud jr"},
+            {"first_name": "Buddy", "email": "buddy@example.com", "identifier": "bud"},
+            {"first_name": "Pacifica", "email": "pacifica@example.com", "groups": ["gideon"]},
+            {"first_name": "Soos", "email": "soos@example.com", "groups": "shack"},
+            {"first_name": "Wendy", "email": "wendy@example.com", "identifier": ["w"]},
+            {"first_name": "Stan", "email": "stan@example.com", "groups": ["shack"]}
+        ])
+        self.assertEqual(["bud"], [reader.identifier for reader in report.accepted[:1]])
+        self.assertEqual(2, len(report.accepted))
+        self.assertEqual(3, len(readers))
+        self.assertEqual([1, 2, 3, 4, 5], [rejected.position for rejected in report.rejected])
+        self.assertEqual(
+            ["Invalid Email", "Invalid identifier - 'bud jr'", "Invalid first name - 'Bud Jr'"],
+            report.rejected[0].reasons
+        )
+        self.assertEqual(["'bud' not unique"], report.rejected[1].reasons)
+        self.assertEqual(
+            ["Group conflicts with user identifier 'gideon'"], report.rejected[2].reasons
+        )
+        self.assertEqual(["Invalid list of groups"], report.rejected[3].reasons)
+        self.assertEqual(["Identifier must be a String"], report.rejected[4].reasons)
+        self.assertEqual(set(["shack"]), readers.groups)
+        self.assertEqual(5, len(report.as_dict()["rejected"]))
+
+    def _import_with_bad_row(self, row):
+        readers = ReaderCollection()
+        report = readers.import_readers(
+            [{"first_name": "Ford", "email": "ford@example.com"}, row],
+            identifiers_from_email=True
+        )
+        self.assertEqual(1, len(readers))
+        self.assertEqual([1], [rejected.position for rejected in report.rejected])
+        return report.rejected[0].reasons
+
+    def test_rejects_row_without_email(self):
+        self.assertEqual(["Invalid Email"], self._import_with_bad_row({"first_name": "Bill"}))
+
+    def test_rejects_row_with_null_email(self):
+        self.assertEqual(
+            ["Invalid Email"], self._import_with_bad_row({"first_name": "Bill", "email": None})
+        )
+
+    def test_rejects_row_with_nested_groups(self):
+        self.assertEqual(
+            ["Invalid list of groups"],
+            self._import_with_bad_row(
+                {"first_name": "Bill", "email": "bill@example.com", "groups": [["x"]]}
+            )
+        )
+
+    def test_loaders_report_invalid_rows(self):
+        rows = [
+            {"firstName": "Stan", "email": "stan@example.com", "identifier": "stan"},
+            {"firstName": "Ford", "email": "not an email"},
+            {"firstName": "Soos", "email": "soos@example.com", "identifier": "stan"},
+            {"firstName": "Wendy", "email": "wendy@example.com", "groups": [["x"]]},
+            {"firstName": "Mabel", "email": "mabel@example.com"}
+        ]
+
+        class SmallBatches(ReaderCollection):
+            load_batch_size = 2
+
+        readers, report = SmallBatches.from_jsonl(
+            StringIO("\n".join(json.dumps(row) for row in rows)), report=True
+        )
+        self.assertEqual(["Stan", "Mabel"], [reader.first_name for reader in readers])
+        self.assertEqual(2, len(report.accepted))
+        self.assertEqual([1, 2, 3], [rejected.position for rejected in report.rejected])
+        self.assertEqual(rows[2], report.rejected[1].data)
+        self.assertEqual(["'stan' not unique"], report.rejected[1].reasons)
+        with self.assertRaises(ValueError):
+            SmallBatches.from_jsonl(StringIO("\n".join(json.dumps(row) for row in rows)))
+
+    def test_matches_reader_validation(self):
+        rows = [
+            {"first_name": "Mabel", "email": "mabel@example.com"},
+            {"first_name": "Mabel", "email": "mabel@example"},
+            {"first_name": "Mabel", "last_name": "Pines Pines", "email": "m@example.com"},
+            {"first_name": "Mabel", "email": "m2@example.com", "groups": ["a b"]}
+        ]
+        report = ReaderCollection().import_readers(rows)
+        for position, row in enumerate(rows):
+            rejected = position in [rejected.position for rejected in report.rejected]
+            try:
+                ReaderCollection().add_reader(**row)
+                valid = True
+            except (ValueError, TypeError):
+                valid = False
+            self.assertEqual(valid, not rejected)
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from tsidii.parser import HTMLParser
+from tsidii.reader import ReaderCollection
+from tsidii.render import iter_chunks, reader_parts
+from tsidii.stats import RenderStats
+
+
+class TestReaderParts(TestCase):
+
+    def setUp(self):
+        self.parser = HTMLParser()
+        self.compiled = self.parser.compile(
+            "Hi<note message='pinesfamily'> family</note>"
+        )
+        self.recipients = ReaderCollection()
+        for identifier, groups in (("mabel", ["pinesfamily"]), ("stan", None),
+                                   ("dippy", ["pinesfamily"])):
+            self.recipients.add_reader(
+                first_name=identifier,
+                email="{}@example.com".format(identifier),
+                identifier=identifier,
+                groups=groups
+            )
+
+    def test_resolves_every_class_once(self):
+        index = self.parser.audience_index(self.compiled)
+        batches = []
+
+        def evaluate(readers):
+            batches.append([reader.identifier for reader in readers])
+            return index.actions(readers)
+
+        classes = {}
+        stats = RenderStats()
+        resolved = list(reader_parts(
+            self.compiled, evaluate, self.recipients, 2, classes, stats
+        ))
+        self.assertEqual([["mabel", "stan"], ["dippy"]], batches)
+        self.assertEqual(2, len(classes))
+        self.assertEqual(2, stats.counters["classes"])
+        self.assertIs(resolved[0][2], resolved[2][2])
+        self.assertEqual(
+            [("mabel", "Hi family"), ("stan", "Hi"), ("dippy", "Hi family")],
+            [(reader.identifier, self.parser.fill(parts, reader)[0])
+             for reader, _, parts in resolved]
+        )
+
+    def test_iter_chunks(self):
+        self.assertEqual([[0, 1], [2]], list(iter_chunks(range(3), 2)))
@@ -0,0 +1,131 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.reader import ReaderCollection, CompactReaderCollection
+from tsidii.scanner import NoteScanner
+from tsidii.sharding import (
+    ShardManifest, iter_records, load_shard, reader_shard, shard_for
+)
+
+BODY = (
+    "<p>Hello<note message='group1'> group one</note>"
+    "<note private='reader3 reader11'>psst</note></p>"
+)
+
+
+def _render_shard(job):
+    path, manifest, shard = job
+    manifest = ShardManifest.from_json(manifest)
+    with open(path) as fp:
+        readers = load_shard(fp, shard, manifest.num_shards)
+    parser = NoteScanner()
+    manifest.verify(BODY, parser, shard, readers)
+    return [
+        (reader.identifier, result)
+        for reader, result in TsidiiEmail(BODY, readers, parser).reader_emails()
+    ]
+
+
+class TestSharding(TestCase):
+
+    def setUp(self):
+        self.readers = ReaderCollection()
+        for number in range(60):
+            self.readers.add_reader(
+                first_name="Reader",
+                email="reader{}@example.com".format(number),
+                identifier="reader{}".format(number),
+                groups=["group{}".format(number % 3)]
+            )
+
+    def test_shard_for_is_stable(self):
+        self.assertEqual(shard_for("reader1", 7), shard_for("reader1", 7))
+        self.assertEqual(
+            reader_shard({"email": "Stan@Example.com"}, 5),
+            reader_shard({"email": "stan@example.com", "identifier": None}, 5)
+        )
+        shards = [shard_for("reader{}".format(number), 4) for number in range(400)]
+        self.assertEqual({0, 1, 2, 3}, set(shards))
+        with self.assertRaises(ValueError):
+            shard_for("reader1", 0)
+
+    def test_iter_records_formats(self):
+        lines = "\n".join(json.dumps(reader.get_data()) for reader in self.readers) + "\n"
+        data = [reader.get_data() for reader in self.readers]
+        other_keys = json.dumps({"version": 2, "meta": {"readers": []}, "readers": data}, indent=2)
+        for text in (self.readers.as_json(), lines, other_keys):
+            for chunk_size in (1, 7, 65536):
+                self.assertEqual(data, list(iter_records(StringIO(text), chunk_size)))
+        self.assertEqual([], list(iter_records(StringIO('{"version": 2}'))))
+
+    def test_shards_are_disjoint_and_complete(self):
+        text = self.readers.as_json()
+        manifest = ShardManifest.create(BODY, NoteScanner(), iter_records(StringIO(text)), 4)
+        self.assertEqual(60, manifest.total)
+        seen = []
+        for shard in range(4):
+            collection = load_shard(StringIO(text), shard, 4, CompactReaderCollection)
+            self.assertEqual(manifest.counts[shard], len(collection))
+            seen.extend(reader.identifier for reader in collection)
+        self.assertEqual(
+            sorted(reader.identifier for reader in self.readers), sorted(seen)
+        )
+        with self.assertRaises(ValueError):
+            load_shard(StringIO(text), 4, 4)
+
+    def test_shards_derive_missing_identifiers_from_emails(self):
+        text = "\n".join(
+            json.dumps(dict(reader.get_data(), identifier=None)) for reader in self.readers
+        )
+        loaded = ReaderCollection.from_jsonl(StringIO(text), identifiers_from_email=True)
+        expected = dict((reader.email, reader.identifier) for reader in loaded)
+        for shard in range(3):
+            runs = [
+                [(reader.email, reader.identifier) for reader in
+                 load_shard(StringIO(text), shard, 3)]
+                for _ in range(2)
+            ]
+            self.assertEqual(runs[0], runs[1])
+            for email, identifier in runs[0]:
+                self.assertEqual(expected[email], identifier)
+
+    def test_manifest_checks_workers(self):
+        manifest = ShardManifest.create(
+            BODY, NoteScanner(), (reader.get_data() for reader in self.readers), 3
+        )
+        copy = ShardManifest.from_json(manifest.as_json())
+        self.assertEqual(manifest.counts, copy.counts)
+        copy.verify(BODY, NoteScanner())
+        with self.assertRaises(ValueError):
+            copy.verify(BODY + " ", NoteScanner())
+        with self.assertRaises(ValueError):
+            copy.verify(BODY, NoteScanner(note_tag="aside"))
+        with self.assertRaises(ValueError):
+            copy.verify(BODY, NoteScanner(), 0, ReaderCollection())
+
+    def test_processes_render_every_reader_once(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "readers.json")
+        with open(path, "w") as fp:
+            self.readers.dump(fp)
+        with open(path) as fp:
+            manifest = ShardManifest.create(BODY, NoteScanner(), iter_records(fp), 3)
+        with multiprocessing.Pool(3) as pool:
+            shards = pool.map(
+                _render_shard, [(path, manifest.as_json(), shard) for shard in range(3)]
+            )
+        rendered = [item for shard in shards for item in shard]
+        self.assertEqual(
+            sorted(
+                (reader.identifier, result) for reader, result in
+                TsidiiEmail(BODY, self.readers, NoteScanner()).reader_emails()
+            ),
+            sorted(rendered)
+        )
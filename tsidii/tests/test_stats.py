@@ -0,0 +1,65 @@
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.parser import HTMLParser
+from tsidii.reader import ReaderCollection
+from tsidii.stats import RenderStats
+
+
+class TestRenderStats(TestCase):
+
+    def setUp(self):
+        self.body = (
+            "Hi<note message='pinesfamily'> family</note>"
+            "<note private='dippy'>!</note><note>never</note>"
+        )
+        self.recipients = ReaderCollection()
+        self.recipients.add_reader(
+            first_name="Mabel",
+            email="mabel@example.com",
+            identifier="mabel",
+            groups=["pinesfamily"]
+        )
+        self.recipients.add_reader(
+            first_name="Dipper",
+            email="dipper@example.com",
+            identifier="dippy",
+            groups=["pinesfamily"]
+        )
+
+    def test_reader_emails_stats(self):
+        calls = []
+        stats = RenderStats(callback=lambda reader, counts: calls.append((reader.identifier, counts)))
+        email = TsidiiEmail(self.body, self.recipients)
+        results = list(email.reader_emails(stats=stats))
+        self.assertEqual(
+            [result for _, result in email.reader_emails()],
+            [result for _, result in results]
+        )
+        counters = stats.as_dict()["counters"]
+        self.assertEqual(2, counters["readers"])
+        self.assertEqual(2, counters["classes"])
+        self.assertEqual(6, counters["notes"])
+        self.assertEqual(3, counters["decomposed"])
+        self.assertEqual(2, counters["unwrapped"])
+        self.assertEqual(1, counters["private"])
+        self.assertEqual(1, counters["private_emails"])
+        self.assertEqual(
+            sum(len(message) for _, (message, _) in results), counters["bytes_out"]
+        )
+        self.assertEqual(["mabel", "dippy"], [identifier for identifier, _ in calls])
+        self.assertEqual(1, calls[1][1]["private"])
+        self.assertTrue(all(seconds >= 0 for seconds in stats.timers.values()))
+
+    def test_parse_reader_email_stats(self):
+        stats = RenderStats()
+        reader = self.recipients.get("dippy")
+        result = HTMLParser().parse_reader_email(self.body, reader, stats=stats)
+        self.assertEqual(("Hi family Dipper - !", True), result)
+        self.assertEqual(1, stats.counters["readers"])
+        self.assertGreater(stats.timers["compile"], 0)
+
+    def test_workers_and_stats(self):
+        email = TsidiiEmail(self.body, self.recipients)
+        with self.assertRaises(ValueError):
+            email.reader_emails(workers=2, stats=RenderStats())
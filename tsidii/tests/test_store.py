@@ -0,0 +1,143 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.reader import ReaderCollection
+from tsidii.store import SQLiteReaderCollection
+
+
+class TestSQLiteReaderCollection(TestCase):
+
+    def _readers(self, collection):
+        collection.add_reader(
+            first_name="Gideon",
+            last_name="Gleeful",
+            email="tentoftelepathy@example.com",
+            identifier="gideon",
+            groups=["gleefuls", "tent"]
+        )
+        collection.add_reader(
+            first_name="Bud",
+            email="usedcardeals@example.com",
+            identifier="bud",
+            groups=["gleefuls"]
+        )
+        collection.add_reader(
+            first_name="Pacífica",
+            last_name="",
+            email="pacifica@example.com",
+            identifier="pacifica"
+        )
+        return collection
+
+    def test_matches_reader_collection(self):
+        readers = self._readers(ReaderCollection())
+        stored = self._readers(SQLiteReaderCollection(page_size=2))
+        self.assertEqual(readers.as_json(), stored.as_json())
+        self.assertEqual(readers.groups, stored.groups)
+        self.assertEqual(3, len(stored.readers))
+        self.assertEqual("pacifica", stored.readers[-1].identifier)
+        self.assertEqual("", stored.readers[2].last_name)
+        self.assertIsNone(stored.readers[1].last_name)
+
+    def test_lookups(self):
+        stored = self._readers(SQLiteReaderCollection())
+        self.assertEqual("Bud", stored.get("bud").first_name)
+        self.assertIsNone(stored.get("stan"))
+        self.assertEqual(
+            ["gideon", "bud"],
+            [reader.identifier for reader in stored.readers_in_group("gleefuls")]
+        )
+        self.assertEqual([], stored.readers_in_group("pines"))
+
+    def test_keeps_error_semantics(self):
+        stored = self._readers(SQLiteReaderCollection())
+        with self.assertRaises(ValueError):
+            stored.add_reader(
+                first_name="Bud",
+                email="bud@example.com",
+                identifier="bud"
+            )
+        with self.assertRaises(ValueError):
+            stored.add_reader(
+                first_name="Stan",
+                email="stan@example.com",
+                identifier="stan",
+                groups=["gideon"]
+            )
+        with self.assertRaises(ValueError):
+            stored.add_readers([
+                {"first_name": "Stan", "email": "stan@example.com", "identifier": "stan"},
+                {"first_name": "Ford", "email": "ford@example.com", "groups": ["bud"]}
+            ])
+        self.assertEqual(3, len(stored))
+        report = stored.import_readers([
+            {"first_name": "Stan", "email": "stan@example.com", "identifier": "stan"},
+            {"first_name": "Bud", "email": "bud@example.com", "identifier": "bud"}
+        ])
+        self.assertEqual(1, len(report.accepted))
+        self.assertEqual(1, len(report.rejected))
+        self.assertEqual(4, len(stored))
+
+    def test_allocates_identifiers(self):
+        stored = self._readers(SQLiteReaderCollection())
+        added = stored.add_readers(
+            [{"first_name": "Stan", "email": "stan@example.com"}],
+            identifier_seed=618
+        )
+        self.assertEqual(added[0].identifier, stored.readers[3].identifier)
+        identifiers = stored.allocate_identifiers(count=1000, seed=618)
+        self.assertEqual(1000, len(set(identifiers)))
+        self.assertNotIn(added[0].identifier, identifiers)
+
+    def test_renders_email(self):
+        body = (
+            "<p>Hi<note message='gleefuls'> gleeful</note>"
+            "<note private='bud'>cars</note></p>"
+        )
+        readers = self._readers(ReaderCollection())
+        stored = self._readers(SQLiteReaderCollection(page_size=1))
+        self.assertEqual(
+            [(reader.identifier, result) for reader, result in
+             TsidiiEmail(body, readers).reader_emails()],
+            [(reader.identifier, result) for reader, result in
+             TsidiiEmail(body, stored).reader_emails()]
+        )
+
+    def test_async_reader_emails(self):
+        body = "<p>Hi<note message='gleefuls'> gleeful</note></p>"
+        stored = self._readers(SQLiteReaderCollection(page_size=1))
+        email = TsidiiEmail(body, stored)
+
+        async def collect():
+            return [
+                (reader.identifier, result)
+                async for reader, result in email.areader_emails(batch_size=2)
+            ]
+        self.assertEqual(
+            [(reader.identifier, result) for reader, result in email.reader_emails()],
+            asyncio.run(collect())
+        )
+
+    def test_groups_are_cached(self):
+        stored = self._readers(SQLiteReaderCollection())
+        groups = stored.groups
+        self.assertIs(groups, stored.groups)
+        stored.add_reader(
+            first_name="Stan", email="stan@example.com", identifier="stan", groups=["shack"]
+        )
+        self.assertEqual({"gleefuls", "tent", "shack"}, stored.groups)
+
+    def test_persists_to_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "readers.db")
+        with SQLiteReaderCollection(path) as stored:
+            self._readers(stored)
+        with SQLiteReaderCollection(path) as stored:
+            self.assertEqual(3, len(stored))
+            self.assertEqual({"gleefuls", "tent"}, stored.groups)
+            self.assertEqual("gideon", stored.get("gideon").identifier)
@@ -0,0 +1,91 @@
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from tsidii.email import TsidiiEmail
+from tsidii.parser import HTMLParser
+from tsidii.reader import ReaderCollection
+from tsidii.scanner import NoteScanner
+from tsidii.streaming import StreamingEmail, text_chunks
+from tsidii.template import UNWRAP
+
+
+class TestStreamingEmail(TestCase):
+
+    def setUp(self):
+        self.readers = ReaderCollection()
+        self.readers.add_reader(
+            first_name="Mabel",
+            email="mabel@example.com",
+            identifier="mabel",
+            groups=["mysterytwins"]
+        )
+        self.readers.add_reader(
+            first_name="Stan",
+            email="stan@example.com",
+            identifier="stan",
+            groups=["mysteryshack"]
+        )
+        self.body = (
+            "<p>Hi<!-- <note message='stan'>comment</note> -->"
+            "<note message='mysterytwins'> twins<note private='mabel'>sweater</note></note>"
+            "<script>var note = '<note>';</script>"
+            "<NOTE hidden='mysteryshack'> tourists</NOTE> &amp; friends</p>"
+        ) * 3
+
+    def test_chunks_compile_like_whole_body(self):
+        scanner = NoteScanner(cache=False)
+        whole = scanner.compile(self.body)
+        actions = tuple(UNWRAP for note in whole.notes)
+        for chunk_size in (1, 2, 3, 7, 64, len(self.body)):
+            compiled = scanner.compile_stream(text_chunks(self.body, chunk_size))
+            self.assertEqual(
+                [(note.attrs, note.parent) for note in whole.notes],
+                [(note.attrs, note.parent) for note in compiled.notes]
+            )
+            self.assertEqual(whole.resolve(actions), compiled.resolve(actions))
+            if chunk_size == 7:
+                # Text is split on chunks, comments and scripts are held whole
+                self.assertLessEqual(max(
+                    len(segment) for segment in compiled.segments
+                    if isinstance(segment, str)
+                ), 7 + len("<script>var note = '<note>';</script>"))
+
+    def test_matches_reader_emails(self):
+        expected = [
+            (reader.identifier, result) for reader, result in
+            TsidiiEmail(self.body, self.readers, parser=NoteScanner()).reader_emails()
+        ]
+        email = StreamingEmail(StringIO(self.body), self.readers, chunk_size=5)
+        self.assertEqual(
+            expected,
+            [
+                (reader.identifier, ("".join(chunks), private))
+                for reader, chunks, private in email.reader_chunks()
+            ]
+        )
+        outputs = {}
+        written = list(email.write_emails(
+            lambda reader: outputs.setdefault(reader.identifier, StringIO())
+        ))
+        self.assertEqual([True, False], [private for _, _, private in written])
+        self.assertEqual(
+            dict((identifier, result[0]) for identifier, result in expected),
+            dict((identifier, output.getvalue()) for identifier, output in outputs.items())
+        )
+
+    def test_other_parsers_join_chunks(self):
+        email = StreamingEmail(iter([self.body[:10], self.body[10:]]), self.readers,
+                               parser=HTMLParser())
+        expected = TsidiiEmail(self.body, self.readers).reader_emails()
+        for (reader, chunks, private), (_, result) in zip(email.reader_chunks(), expected):
+            self.assertEqual(result, ("".join(chunks), private))
+
+    def test_invalid_sources(self):
+        with self.assertRaises(ValueError):
+            StreamingEmail(BytesIO(b"<p>Hi</p>"), self.readers)
+        with self.assertRaises(ValueError):
+            StreamingEmail([b"<p>Hi</p>"], self.readers)
+        with self.assertRaises(ValueError):
+            StreamingEmail("<p>Hi</p>", self.readers, chunk_size=0)
+        with self.assertRaises(ValueError):
+            StreamingEmail("<p>Hi</p>", [])
@@ -0,0 +1,84 @@
+from unittest import TestCase, skipIf
+
+from tsidii.parser import HTMLParser
+from tsidii.reader import ReaderCollection
+from tsidii.template import DECOMPOSE, UNWRAP, PRIVATE
+from tsidii.visibility import AudienceIndex, audience_tokens, _load_numpy
+
+numpy = _load_numpy()
+
+
+class TestAudienceIndex(TestCase):
+
+    def setUp(self):
+        self.parser = HTMLParser()
+        self.readers = ReaderCollection()
+        self.readers.add_reader(
+            first_name="Mabel",
+            email="mabel@example.com",
+            identifier="mabel",
+            groups=["pinesfamily", "mysterytwins"]
+        )
+        self.readers.add_reader(
+            first_name="Stan",
+            email="stan@example.com",
+            identifier="stan",
+            groups=["mysteryshack"]
+        )
+
+    def test_audience_tokens(self):
+        self.assertEqual(
+            frozenset(["mabel", "dippy", "soos"]),
+            audience_tokens(" mabel, dippy  soos")
+        )
+        self.assertEqual(frozenset(), audience_tokens(None))
+
+    def test_partial_names_do_not_match(self):
+        compiled = self.parser.compile("<note message='mysterytwinsclub ma'>Hi</note>")
+        for use_numpy in (False, numpy is not None):
+            index = AudienceIndex(compiled, use_numpy=use_numpy)
+            self.assertEqual([(DECOMPOSE,), (DECOMPOSE,)], index.actions(self.readers.readers))
+
+    def test_python_actions(self):
+        compiled = self.parser.compile(
+            "<note hidden='stan'>A</note><note private='mysteryshack'>B</note>"
+            "<note message='mabel'>C<note message='stan'>D</note></note><note>E</note>"
+        )
+        index = AudienceIndex(compiled, use_numpy=False)
+        self.assertEqual(
+            [
+                (UNWRAP, DECOMPOSE, UNWRAP, DECOMPOSE, DECOMPOSE),
+                (DECOMPOSE, PRIVATE, DECOMPOSE, DECOMPOSE, DECOMPOSE)
+            ],
+            index.actions(self.readers.readers)
+        )
+
+    @skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_matches_python_with_many_groups(self):
+        readers = ReaderCollection()
+        for number in range(40):
+            readers.add_reader(
+                first_name="Reader",
+                email="reader{}@example.com".format(number),
+                identifier="reader{}".format(number),
+                groups=["group{}".format(number % 7), "group{}".format(number + 60)]
+            )
+        body = "".join(
+            "<note message='group{0} reader{1}' hidden='group{2}' private='group{3}'>"
+            "{0}<note message='group{4}'>inner</note></note>".format(
+                number, number * 3, number + 61, number + 90, number % 7
+            )
+            for number in range(40)
+        )
+        compiled = self.parser.compile(body)
+        python = AudienceIndex(compiled, use_numpy=False)
+        vectorized = AudienceIndex(compiled, use_numpy=True)
+        self.assertGreater(vectorized.words, 1)
+        self.assertEqual(
+            python.actions(readers.readers),
+            vectorized.actions(readers.readers)
+        )
+        self.assertEqual(
+            [self.parser.note_actions(compiled, reader) for reader in readers],
+            vectorized.actions(readers.readers)
+        )
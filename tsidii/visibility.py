@@ -0,0 +1,154 @@
+import re
+
+from tsidii.template import DECOMPOSE, UNWRAP, PRIVATE
+
+_TOKEN_SEPARATOR = re.compile(r"[\s,]+")
+
+# NumPy is slow to import, it is loaded by the first index that uses it
+numpy = None
+_numpy_checked = False
+
+
+def _load_numpy():
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - numpy is optional
+            numpy = None
+    return numpy
+
+
+def audience_tokens(value):
+    '''
+        Splits a note attribute into the identifiers and groups it names
+
+        :param string value: Raw attribute value, names separated by spaces or commas
+        :return frozenset<string>: The names in the attribute
+    '''
+    if not value:
+        return frozenset()
+    return frozenset(token for token in _TOKEN_SEPARATOR.split(value) if token)
+
+
+class AudienceIndex(object):
+    '''
+        Decides the note actions for many readers at once. Every name used
+        by a note of the body is given a bit, readers and note audiences
+        become bitmasks and visibility is a bitwise and. NumPy is used to
+        evaluate a whole batch of readers when it is installed, it is only
+        imported once a body with notes needs an index. Indexes that share
+        a bits dict give every reader the same mask.
+    '''
+
+    def __init__(self, compiled, use_numpy=None, bits=None):
+        self.notes = compiled.notes
+        self.bits = {} if bits is None else bits
+        for note in self.notes:
+            for token in sorted(note.message | note.hidden | note.private):
+                self.bits.setdefault(token, len(self.bits))
+        self.message = [self._mask(note.message) for note in self.notes]
+        self.hidden = [self._mask(note.hidden) for note in self.notes]
+        self.private = [self._mask(note.private) for note in self.notes]
+        if use_numpy is None:
+            use_numpy = bool(self.notes) and _load_numpy() is not None
+        elif use_numpy and _load_numpy() is None:
+            raise ValueError("NumPy is not installed")
+        self.use_numpy = use_numpy and bool(self.notes)
+        if self.use_numpy:
+            self.words = max(1, (len(self.bits) + 63) // 64)
+            # Names added later by indexes sharing the bits are never used here
+            self._word_limit = (1 << (64 * self.words)) - 1
+            self._message_words = self._word_matrix(self.message)
+            self._hidden_words = self._word_matrix(self.hidden)
+            self._private_words = self._word_matrix(self.private)
+            self._has_attrs = numpy.array([bool(note.attrs) for note in self.notes])
+            self._has_hidden = numpy.array([note.has_hidden for note in self.notes])
+
+    def reader_mask(self, reader):
+        '''
+            :param TsidiiReader reader: Reader to build the mask for
+            :return int: Bits of every note name matching the reader
+        '''
+        mask = 0
+        bit = self.bits.get(reader.identifier)
+        if bit is not None:
+            mask |= 1 << bit
+        for group in reader.groups or ():
+            bit = self.bits.get(group)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def actions(self, readers):
+        '''
+            Decides what happens to every note for a batch of readers
+
+            :param list<TsidiiReader> readers: Readers to evaluate
+            :return list<tuple>: An action per note, in document order, per reader
+        '''
+        return self.masks_actions([self.reader_mask(reader) for reader in readers])
+
+    def masks_actions(self, masks):
+        '''
+            Decides what happens to every note for a batch of reader masks
+
+            :param list<int> masks: Masks returned by reader_mask
+            :return list<tuple>: An action per note, in document order, per mask
+        '''
+        if self.use_numpy:
+            return [tuple(row) for row in self._matrix(masks).tolist()]
+        return [self.mask_actions(mask) for mask in masks]
+
+    def _mask(self, tokens):
+        mask = 0
+        for token in tokens:
+            mask |= 1 << self.bits[token]
+        return mask
+
+    def mask_actions(self, mask):
+        '''
+            :param int mask: Mask returned by reader_mask
+            :return tuple: An action per note, in document order
+        '''
+        actions = []
+        for index, note in enumerate(self.notes):
+            if not note.attrs or (
+                    note.parent is not None and actions[note.parent] == DECOMPOSE):
+                actions.append(DECOMPOSE)
+            elif note.has_hidden and not mask & self.hidden[index]:
+                actions.append(UNWRAP)
+            elif mask & self.private[index]:
+                actions.append(PRIVATE)
+            elif mask & self.message[index]:
+                actions.append(UNWRAP)
+            else:
+                actions.append(DECOMPOSE)
+        return tuple(actions)
+
+    def _word_matrix(self, masks):
+        if self.words == 1:
+            return numpy.array(masks, dtype=numpy.uint64).reshape(len(masks), 1)
+        rows = numpy.zeros((len(masks), self.words), dtype=numpy.uint64)
+        for row, mask in enumerate(masks):
+            for word in range(self.words):
+                rows[row, word] = (mask >> (64 * word)) & 0xFFFFFFFFFFFFFFFF
+        return rows
+
+    def _matrix(self, masks):
+        masks = [mask & self._word_limit for mask in masks]
+        readers = self._word_matrix(masks)[:, None, :]
+        hidden = (readers & self._hidden_words[None, :, :]).any(axis=2)
+        private = (readers & self._private_words[None, :, :]).any(axis=2)
+        message = (readers & self._message_words[None, :, :]).any(axis=2)
+        actions = numpy.where(message, UNWRAP, DECOMPOSE)
+        actions = numpy.where(private, PRIVATE, actions)
+        actions = numpy.where(self._has_hidden & ~hidden, UNWRAP, actions)
+        actions[:, ~self._has_attrs] = DECOMPOSE
+        for index, note in enumerate(self.notes):
+            # Parents come before their children in document order
+            if note.parent is not None:
+                removed = actions[:, note.parent] == DECOMPOSE
+                actions[removed, index] = DECOMPOSE
+        return actions